@@ -3,4 +3,9 @@
 A Model Context Protocol server for Strava coaching with route planning and weather integration.
 """
 
+from dotenv import load_dotenv
+
 __version__ = "0.1.0"
+
+# Read the .env file once, before any module reads its configuration
+load_dotenv()
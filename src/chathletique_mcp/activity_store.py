@@ -0,0 +1,195 @@
+"""Local SQLite store of Strava activities with incremental delta sync.
+
+Activities are kept per athlete and synced using the newest stored ``start_date``
+as the ``after`` cursor, so after the first backfill only new activities are
+fetched from Strava. Reads never hit the network.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import TYPE_CHECKING
+
+from .storage import LazyDatabase, transaction
+
+if TYPE_CHECKING:
+    from stravalib.model import AthleteStats, SummaryActivity
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS activities (
+    athlete_id INTEGER NOT NULL,
+    id INTEGER NOT NULL,
+    start_date TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (athlete_id, id)
+);
+CREATE INDEX IF NOT EXISTS activities_by_date
+    ON activities (athlete_id, start_date DESC);
+CREATE TABLE IF NOT EXISTS athletes (
+    athlete_id INTEGER PRIMARY KEY,
+    synced_at REAL,
+    stats TEXT,
+    stats_synced_at REAL
+);
+CREATE TABLE IF NOT EXISTS tokens (
+    token_hash TEXT PRIMARY KEY,
+    athlete_id INTEGER NOT NULL
+);
+"""
+
+
+def _token_hash(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class ActivityStore:
+    """Persistent per-athlete activity store.
+
+    Args:
+        path: SQLite file, defaults to ``activities.sqlite3`` in the data dir.
+        sync_interval: Minimum number of seconds between two syncs of the same
+            athlete (``STRAVA_SYNC_INTERVAL``, default 60).
+        backfill_limit: Number of activities fetched on the first sync of an
+            athlete (``STRAVA_BACKFILL_LIMIT``, default 200).
+        stats_max_age: Athlete stats are refreshed when new activities arrive,
+            or at the latest after this many seconds (default 3600).
+    """
+
+    def __init__(
+        self,
+        path: str | os.PathLike | None = None,
+        sync_interval: float | None = None,
+        backfill_limit: int | None = None,
+        stats_max_age: float = 3600,
+    ):
+        self._db = LazyDatabase(path, "activities.sqlite3", SCHEMA)
+        self.sync_interval = (
+            sync_interval
+            if sync_interval is not None
+            else float(os.getenv("STRAVA_SYNC_INTERVAL", "60"))
+        )
+        self.backfill_limit = backfill_limit or int(
+            os.getenv("STRAVA_BACKFILL_LIMIT", "200")
+        )
+        self.stats_max_age = stats_max_age
+        self._lock = threading.Lock()
+        self._sync_locks: dict[int, threading.Lock] = {}
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        return self._db.connection()
+
+    # -------------------------------- Sync --------------------------------
+    def athlete_id(self, client) -> int:
+        """Return the athlete id owning the client's token, asking Strava only once."""
+        token_hash = _token_hash(client.access_token or "")
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT athlete_id FROM tokens WHERE token_hash = ?", (token_hash,)
+            ).fetchone()
+        if row:
+            return row[0]
+
+        athlete_id = int(client.get_athlete().id)  # API call
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO tokens VALUES (?, ?)", (token_hash, athlete_id)
+            )
+        return athlete_id
+
+    def sync(self, client, athlete_id: int, force: bool = False) -> int:
+        """Fetch the activities newer than the stored ones.
+
+        Args:
+            client: Authenticated ``stravalib.Client`` of the athlete.
+            athlete_id: Strava id of the athlete.
+            force: Sync even if the last sync is more recent than ``sync_interval``.
+
+        Returns:
+            int: Number of new or updated activities stored.
+        """
+        with self._lock:
+            sync_lock = self._sync_locks.setdefault(athlete_id, threading.Lock())
+
+        # Concurrent tool calls for the same athlete share a single sync
+        with sync_lock:
+            synced_at, stats, stats_synced_at = self._athlete_row(athlete_id)
+            now = time.time()
+            if not force and synced_at and now - synced_at < self.sync_interval:
+                return 0
+
+            cursor = self.latest_start_date(athlete_id)
+            if cursor:
+                activities = client.get_activities(after=cursor)  # delta only
+            else:
+                activities = client.get_activities(limit=self.backfill_limit)
+
+            rows = [
+                (
+                    athlete_id,
+                    int(activity.id),
+                    activity.start_date.isoformat(),
+                    activity.model_dump_json(exclude_none=True),
+                )
+                for activity in activities
+            ]
+
+            refresh_stats = (
+                rows or not stats or now - (stats_synced_at or 0) > self.stats_max_age
+            )
+            if refresh_stats:
+                stats = client.get_athlete_stats(athlete_id).model_dump_json(
+                    exclude_none=True
+                )
+                stats_synced_at = now
+
+            with self._lock, transaction(self.conn):
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO activities VALUES (?, ?, ?, ?)", rows
+                )
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO athletes VALUES (?, ?, ?, ?)",
+                    (athlete_id, now, stats, stats_synced_at),
+                )
+            return len(rows)
+
+    # -------------------------------- Reads --------------------------------
+    def latest_start_date(self, athlete_id: int) -> datetime | None:
+        """Return the start date of the newest stored activity, used as sync cursor."""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT MAX(start_date) FROM activities WHERE athlete_id = ?",
+                (athlete_id,),
+            ).fetchone()
+        return datetime.fromisoformat(row[0]) if row and row[0] else None
+
+    def recent_activities(self, athlete_id: int, limit: int) -> "list[SummaryActivity]":
+        """Return the ``limit`` most recent stored activities, newest first."""
+        from stravalib.model import SummaryActivity  # noqa: PLC0415 (slow import)
+
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT payload FROM activities WHERE athlete_id = ? "
+                "ORDER BY start_date DESC LIMIT ?",
+                (athlete_id, limit),
+            ).fetchall()
+        return [SummaryActivity.model_validate_json(payload) for (payload,) in rows]
+
+    def athlete_stats(self, athlete_id: int) -> "AthleteStats | None":
+        """Return the last stats snapshot stored for the athlete."""
+        from stravalib.model import AthleteStats  # noqa: PLC0415 (slow import)
+
+        _, stats, _ = self._athlete_row(athlete_id)
+        return AthleteStats.model_validate_json(stats) if stats else None
+
+    def _athlete_row(self, athlete_id: int) -> tuple:
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT synced_at, stats, stats_synced_at FROM athletes "
+                "WHERE athlete_id = ?",
+                (athlete_id,),
+            ).fetchone()
+        return row or (None, None, None)
@@ -0,0 +1,77 @@
+"""Thread-safe in-memory cache with LRU and TTL eviction."""
+
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Hashable
+from typing import Any
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Bounded LRU cache whose entries also expire after a time-to-live.
+
+    Args:
+        maxsize: Maximum number of entries; the least recently used is evicted.
+        ttl: Default lifetime of an entry in seconds, None to never expire.
+        clock: Time source, for tests.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float | None = None, clock=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock or time.monotonic
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: OrderedDict[Hashable, tuple[Any, float | None]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value, or ``default`` if missing or expired."""
+        with self._lock:
+            value, expires_at = self._data.get(key, (_MISSING, None))
+            expired = expires_at is not None and expires_at <= self.clock()
+            if value is not _MISSING and expired:
+                del self._data[key]
+                value = _MISSING
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        """Store a value, with an optional lifetime overriding the default one."""
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = self.clock() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove an entry and return its value."""
+        with self._lock:
+            return self._data.pop(key, (default, None))[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict[str, int]:
+        """Return hit/miss/eviction counters and the current size."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._data),
+            }
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -0,0 +1,74 @@
+"""Pool of reusable Strava clients sharing one keep-alive HTTP session."""
+
+import os
+import threading
+import time
+from typing import TYPE_CHECKING
+
+from requests.adapters import HTTPAdapter
+
+from .rate_limit import GovernedSession
+
+if TYPE_CHECKING:
+    import stravalib
+
+
+class StravaClientPool:
+    """Per-token pool of ``stravalib.Client`` objects.
+
+    All clients share a single governed ``requests`` session, so repeated tool
+    calls reuse the open TLS connections to Strava instead of doing a new
+    handshake. stravalib passes the access token as a request parameter, which
+    keeps the shared session free of any per-athlete state. Clients unused for
+    ``idle_timeout`` seconds are evicted.
+
+    Args:
+        idle_timeout: Seconds before an unused client is evicted
+            (``STRAVA_CLIENT_IDLE_TIMEOUT``, default 900).
+        pool_maxsize: Maximum number of keep-alive connections to Strava
+            (``STRAVA_HTTP_POOL_SIZE``, default 16).
+    """
+
+    def __init__(
+        self, idle_timeout: float | None = None, pool_maxsize: int | None = None
+    ):
+        self.idle_timeout = (
+            idle_timeout
+            if idle_timeout is not None
+            else float(os.getenv("STRAVA_CLIENT_IDLE_TIMEOUT", "900"))
+        )
+        pool_maxsize = pool_maxsize or int(os.getenv("STRAVA_HTTP_POOL_SIZE", "16"))
+        self.session = GovernedSession()
+        self.session.mount(
+            "https://", HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize)
+        )
+        self._clients: dict[str, tuple[stravalib.Client, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> "stravalib.Client":
+        """Return the pooled client of the token, creating it on first use."""
+        import stravalib  # noqa: PLC0415 (slow import, deferred to the first call)
+
+        now = time.monotonic()
+        with self._lock:
+            self._evict_idle(now)
+            entry = self._clients.get(token)
+            client = (
+                entry[0]
+                if entry
+                else stravalib.Client(access_token=token, requests_session=self.session)
+            )
+            self._clients[token] = (client, now)
+        return client
+
+    def _evict_idle(self, now: float) -> None:
+        idle = [
+            token
+            for token, (_, last_used) in self._clients.items()
+            if now - last_used > self.idle_timeout
+        ]
+        for token in idle:
+            del self._clients[token]
+
+    def __len__(self) -> int:
+        return len(self._clients)
@@ -0,0 +1,122 @@
+"""Bounded concurrency helpers for the tools.
+
+``fan_out`` calls an API once per item in a bounded thread pool, and
+``run_blocking`` / ``offload`` move the blocking calls of async tools
+(stravalib, geopy, openrouteservice) off the event loop into a shared bounded
+executor, so one slow tool call does not hold up the other sessions. The
+threads of ``fan_out`` are not part of that executor: the calls they run are
+capped process-wide by ``FAN_OUT_LIMIT`` instead.
+"""
+
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, NamedTuple
+
+# Threads running the blocking calls of the async tools, for all the sessions
+BLOCKING_POOL_SIZE = int(os.getenv("BLOCKING_POOL_SIZE", "16"))
+# Calls of all the fan-outs running at once, whatever tool started them
+FAN_OUT_LIMIT = int(os.getenv("FAN_OUT_LIMIT", "16"))
+
+_fan_out_slots = threading.BoundedSemaphore(FAN_OUT_LIMIT)
+
+_blocking_executor: ThreadPoolExecutor | None = None
+_blocking_executor_lock = threading.Lock()
+
+
+class FanOutResult(NamedTuple):
+    """Outcome of one item of a fan-out: either a value or the error it raised."""
+
+    item: Any
+    value: Any
+    error: Exception | None
+
+
+def fan_out(
+    fn: Callable[[Any], Any],
+    items: Iterable[Any],
+    max_workers: int | None = None,
+) -> Iterator[FanOutResult]:
+    """Call ``fn`` on every item in a bounded thread pool.
+
+    Results are yielded in arrival order. An exception raised for one item is
+    returned in its ``FanOutResult`` instead of aborting the others. Stopping the
+    iteration early (``break``) cancels the calls that have not started yet.
+    Each call runs in a copy of the caller's context, so context variables such
+    as the Strava request priority carry over to the workers. Calls wait for
+    one of the ``FAN_OUT_LIMIT`` slots shared by every fan-out of the process,
+    so ``fn`` must not fan out itself.
+
+    Args:
+        fn: Blocking function called with each item.
+        items: Items to process.
+        max_workers: Maximum number of concurrent calls, defaults to the
+            ``FAN_OUT_CONCURRENCY`` environment variable (4).
+
+    Yields:
+        FanOutResult: One result per item, as soon as it is available.
+    """
+    max_workers = max_workers or int(os.getenv("FAN_OUT_CONCURRENCY", "4"))
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        futures = {
+            executor.submit(
+                contextvars.copy_context().run, _call_in_slot, fn, item
+            ): item
+            for item in items
+        }
+        for future in as_completed(futures):
+            try:
+                yield FanOutResult(futures[future], future.result(), None)
+            except Exception as e:
+                yield FanOutResult(futures[future], None, e)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _call_in_slot(fn: Callable[[Any], Any], item: Any) -> Any:
+    with _fan_out_slots:
+        return fn(item)
+
+
+def get_blocking_executor() -> ThreadPoolExecutor:
+    """Return the executor of the blocking calls, created on first use."""
+    global _blocking_executor  # noqa
+    if _blocking_executor is None:
+        with _blocking_executor_lock:
+            if _blocking_executor is None:
+                _blocking_executor = ThreadPoolExecutor(
+                    max_workers=BLOCKING_POOL_SIZE, thread_name_prefix="blocking"
+                )
+    return _blocking_executor
+
+
+async def run_blocking(fn: Callable[..., Any], /, *args, **kwargs) -> Any:
+    """Await ``fn(*args, **kwargs)`` run in the blocking executor.
+
+    The call runs in a copy of the caller's context, so the access token of
+    the request and the Strava request priority carry over to the thread.
+    Calls beyond ``BLOCKING_POOL_SIZE`` (default 16) wait for a free thread.
+    """
+    call = functools.partial(contextvars.copy_context().run, fn, *args, **kwargs)
+    return await asyncio.get_running_loop().run_in_executor(
+        get_blocking_executor(), call
+    )
+
+
+def offload(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """Decorator turning a blocking function into a coroutine function.
+
+    The wrapper keeps the signature of ``fn``, so it can be registered as an
+    MCP tool: ``@mcp.tool(...)`` then ``@offload`` over a blocking tool.
+    """
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        return await run_blocking(fn, *args, **kwargs)
+
+    return wrapper
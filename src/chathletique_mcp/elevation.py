@@ -0,0 +1,129 @@
+"""Local elevation model read from memory-mapped heightmap tiles.
+
+Tiles cover one degree of latitude and longitude and are named after their
+south-west corner like SRTM (``N48E002``). Both SRTM ``.hgt`` files (square
+grids of big-endian int16, north row first) and ``.npy`` grids with the same
+layout are supported. Tiles are memory-mapped, so sampling a path only reads
+the pages around its points, and elevations are interpolated bilinearly for
+whole batches of points at once.
+"""
+
+import math
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from .geo import densify
+
+VOID = -32768  # SRTM no-data value
+
+
+def tile_name(lat: float, lon: float) -> str:
+    """Return the name of the tile holding a point, e.g. ``N48E002``."""
+    lat0, lon0 = math.floor(lat), math.floor(lon)
+    return (
+        f"{'N' if lat0 >= 0 else 'S'}{abs(lat0):02d}"
+        f"{'E' if lon0 >= 0 else 'W'}{abs(lon0):03d}"
+    )
+
+
+def gain_loss(elevations) -> tuple[float, float]:
+    """Total elevation gain and loss in meters of a profile, skipping gaps."""
+    elevations = np.asarray(elevations, dtype=np.float64)
+    steps = np.diff(elevations[~np.isnan(elevations)])
+    return float(steps[steps > 0].sum()), float(-steps[steps < 0].sum())
+
+
+class ElevationTiles:
+    """Directory of heightmap tiles.
+
+    Args:
+        root: Directory holding the ``.hgt`` or ``.npy`` tiles.
+    """
+
+    def __init__(self, root: str | os.PathLike):
+        self.root = Path(root)
+        self._tiles: dict[str, np.ndarray | None] = {}
+        self._lock = threading.Lock()
+
+    def _tile(self, name: str) -> np.ndarray | None:
+        if name not in self._tiles:
+            with self._lock:
+                if name not in self._tiles:
+                    self._tiles[name] = self._open(name)
+        return self._tiles[name]
+
+    def _open(self, name: str) -> np.ndarray | None:
+        hgt = self.root / f"{name}.hgt"
+        if hgt.exists():
+            grid = np.memmap(hgt, dtype=">i2", mode="r")
+            size = math.isqrt(grid.size)
+            return grid.reshape(size, size)
+        npy = self.root / f"{name}.npy"
+        if npy.exists():
+            return np.load(npy, mmap_mode="r")
+        return None
+
+    def sample(self, lat, lon) -> np.ndarray:
+        """Elevation in meters at each point, NaN where no tile covers it.
+
+        Args:
+            lat: Latitudes in degrees, scalar or array.
+            lon: Longitudes in degrees, same shape.
+        """
+        lat = np.atleast_1d(np.asarray(lat, dtype=np.float64))
+        lon = np.atleast_1d(np.asarray(lon, dtype=np.float64))
+        result = np.full(lat.shape, np.nan)
+        lat0, lon0 = np.floor(lat), np.floor(lon)
+
+        # One vectorized batch per tile
+        corners = np.stack([lat0.ravel(), lon0.ravel()], axis=1)
+        for corner in np.unique(corners, axis=0):
+            grid = self._tile(tile_name(*corner))
+            if grid is None:
+                continue
+            mask = (lat0 == corner[0]) & (lon0 == corner[1])
+            size = grid.shape[0]
+            row = (corner[0] + 1 - lat[mask]) * (size - 1)
+            col = (lon[mask] - corner[1]) * (size - 1)
+            r0 = np.clip(np.floor(row).astype(np.int64), 0, size - 2)
+            c0 = np.clip(np.floor(col).astype(np.int64), 0, size - 2)
+            fr, fc = row - r0, col - c0
+
+            values = np.stack(
+                [grid[r0, c0], grid[r0, c0 + 1], grid[r0 + 1, c0], grid[r0 + 1, c0 + 1]]
+            ).astype(np.float64)
+            values[values == VOID] = np.nan
+            result[mask] = (
+                values[0] * (1 - fr) * (1 - fc)
+                + values[1] * (1 - fr) * fc
+                + values[2] * fr * (1 - fc)
+                + values[3] * fr * fc
+            )
+        return result
+
+    def profile(self, path, step_m: float = 30.0) -> np.ndarray:
+        """Elevations along a (lat, lon) path resampled every ``step_m`` meters."""
+        points = densify(path, step_m)
+        if not len(points):
+            return np.empty(0)
+        return self.sample(points[:, 0], points[:, 1])
+
+    def climb(self, path, step_m: float = 30.0) -> tuple[float, float]:
+        """Elevation gain and loss in meters along a (lat, lon) path."""
+        return gain_loss(self.profile(path, step_m))
+
+
+# Optional directory of elevation tiles, see elevation.py
+ELEVATION_TILES_DIR = os.getenv("ELEVATION_TILES_DIR")
+_elevation: ElevationTiles | None = None
+
+
+def get_elevation() -> ElevationTiles | None:
+    """Return the elevation tiles, or None if ELEVATION_TILES_DIR is not set."""
+    global _elevation  # noqa
+    if ELEVATION_TILES_DIR and _elevation is None:
+        _elevation = ElevationTiles(ELEVATION_TILES_DIR)
+    return _elevation
@@ -0,0 +1,117 @@
+"""Forecast cache aligned on the OpenWeatherMap 3-hour cadence.
+
+The 5-day/3-hour forecast only changes when a new slot starts (every three
+hours, UTC), so forecasts are cached per geohash cell until the next slot.
+Past that point the stale forecast is still served while a background refresh
+fetches the new one: users never wait on a refresh, only on a cold cell.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from .cache import TTLCache
+from .geo import geohash_encode
+from .singleflight import SingleFlight
+
+FORECAST_SLOT = 3 * 3600  # OpenWeatherMap forecast step, in seconds
+
+
+def next_slot(now: float) -> float:
+    """Return the start of the forecast slot following ``now`` (UTC epoch)."""
+    return (now // FORECAST_SLOT + 1) * FORECAST_SLOT
+
+
+class ForecastCache:
+    """Cache of filtered forecasts by geohash cell with stale-while-revalidate.
+
+    Args:
+        maxsize: Number of cells kept in memory.
+        precision: Geohash precision of the cells (``FORECAST_CELL_PRECISION``,
+            default 5, about 5 km).
+        stale_ttl: Seconds a forecast is still served past its slot while it
+            is refreshed (``FORECAST_STALE_TTL``, default one slot).
+        clock: Wall-clock time source, for tests.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        precision: int | None = None,
+        stale_ttl: float | None = None,
+        clock=None,
+    ):
+        self.clock = clock or time.time
+        self.cache = TTLCache(maxsize=maxsize, clock=self.clock)
+        self.precision = precision or int(os.getenv("FORECAST_CELL_PRECISION", "5"))
+        self.stale_ttl = (
+            stale_ttl
+            if stale_ttl is not None
+            else float(os.getenv("FORECAST_STALE_TTL", str(FORECAST_SLOT)))
+        )
+        self._lock = threading.Lock()
+        self._refreshing: set[str] = set()
+        self._tasks: set[asyncio.Task] = set()
+        self._flight = SingleFlight()  # one cold fetch per cell
+
+    def cell(self, lat: float, lon: float) -> str:
+        """Return the cache key of a location."""
+        return geohash_encode(lat, lon, self.precision)
+
+    async def aget(
+        self, lat: float, lon: float, fetch: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Return the forecast of the cell of (lat, lon).
+
+        Concurrent misses of a cell share one fetch, and the stale forecasts
+        are refreshed in a task of the running event loop.
+
+        Args:
+            lat: Latitude of the location.
+            lon: Longitude of the location.
+            fetch: Coroutine function fetching and filtering the forecast of
+                the location; an exception is propagated on a cold cell, and
+                only printed when refreshing a stale forecast.
+        """
+        key = self.cell(lat, lon)
+        entry = self.cache.get(key)
+        if entry is None:
+            return await self._flight.do(key, lambda: self._afill(key, fetch))
+
+        value, fresh_until = entry
+        if self.clock() >= fresh_until:
+            with self._lock:
+                refreshing = key in self._refreshing
+                self._refreshing.add(key)
+            if not refreshing:
+                task = asyncio.create_task(self._arefresh(key, fetch))
+                self._tasks.add(task)  # keep a reference until it is done
+                task.add_done_callback(self._tasks.discard)
+        return value
+
+    async def _afill(self, key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        entry = self.cache.get(key)  # filled while this call was scheduled
+        if entry is not None:
+            return entry[0]
+        return self._store(key, await fetch())
+
+    async def _arefresh(self, key: str, fetch: Callable[[], Awaitable[Any]]) -> None:
+        try:
+            self._store(key, await fetch())
+        except Exception as e:
+            print(f"Error refreshing the forecast of {key}: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _store(self, key: str, value: Any) -> Any:
+        fresh_until = next_slot(self.clock())
+        self.cache.set(
+            key,
+            (value, fresh_until),
+            ttl=fresh_until + self.stale_ttl - self.clock(),
+        )
+        return value
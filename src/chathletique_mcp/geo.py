@@ -0,0 +1,163 @@
+"""Vectorized geodesic helpers."""
+
+import os
+
+import numpy as np
+
+EARTH_RADIUS_M = 6_371_008.8
+DETOUR_FACTOR = float(os.getenv("ROAD_DETOUR_FACTOR", "1.5"))
+
+
+def haversine_m(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Great-circle distance in meters, broadcast over NumPy arrays of degrees."""
+    lat1, lon1, lat2, lon2 = (
+        np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lon1, lat2, lon2)
+    )
+    a = (
+        np.sin((lat2 - lat1) / 2.0) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2.0) ** 2
+    )
+    return 2.0 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def rank_candidate_paths(
+    paths, low: float, high: float, detour_factor: float | None = None
+) -> np.ndarray:
+    """Rank candidate paths whose road distance can fall within ``(low, high)``.
+
+    A road route is never shorter than the great-circle length of the points it
+    visits, and is assumed to be at most ``detour_factor`` times longer. Paths
+    that cannot satisfy the window on geometry alone are discarded, the others
+    are ranked by how close their expected road distance is to the window center.
+
+    Args:
+        paths: Array-like of shape (n, k, 2), the (lat, lon) points each
+            candidate visits in order.
+        low: Lower bound of the road distance window, in meters.
+        high: Upper bound of the road distance window, in meters.
+        detour_factor: Maximum ratio between road and great-circle distance
+            (``ROAD_DETOUR_FACTOR``, default 1.5).
+
+    Returns:
+        np.ndarray: Indices of the plausible paths, best first.
+    """
+    detour_factor = detour_factor or DETOUR_FACTOR
+    paths = np.asarray(paths, dtype=np.float64)
+    if paths.size == 0:
+        return np.empty(0, dtype=np.int64)
+
+    crow = haversine_m(
+        paths[:, :-1, 0], paths[:, :-1, 1], paths[:, 1:, 0], paths[:, 1:, 1]
+    ).sum(axis=1)
+    plausible = (crow < high) & (crow * detour_factor > low)
+    expected = crow * (1.0 + detour_factor) / 2.0
+    order = np.argsort(np.abs(expected - (low + high) / 2.0), kind="stable")
+    return order[plausible[order]]
+
+
+def bearing_deg(lat1, lon1, lat2, lon2):
+    """Initial bearing from the first point to the second, in degrees from north."""
+    lat1, lon1, lat2, lon2 = (np.radians(v) for v in (lat1, lon1, lat2, lon2))
+    y = np.sin(lon2 - lon1) * np.cos(lat2)
+    x = np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(lon2 - lon1)
+    return np.degrees(np.arctan2(y, x)) % 360.0
+
+
+def offset_point(lat, lon, bearing, distance_m) -> tuple[float, float]:
+    """Point ``distance_m`` meters away from (lat, lon) along ``bearing`` degrees.
+
+    Uses a local equirectangular approximation, scaling longitudes by the
+    cosine of the latitude, which is accurate at running distances.
+    """
+    theta = np.radians(bearing)
+    dlat = distance_m * np.cos(theta) / EARTH_RADIUS_M
+    dlon = distance_m * np.sin(theta) / (EARTH_RADIUS_M * np.cos(np.radians(lat)))
+    return float(lat + np.degrees(dlat)), float(lon + np.degrees(dlon))
+
+
+def densify(path, step_m: float) -> np.ndarray:
+    """Resample a (lat, lon) path with points about ``step_m`` meters apart."""
+    path = np.asarray(path, dtype=np.float64).reshape(-1, 2)
+    if len(path) < 2:
+        return path
+    legs = haversine_m(path[:-1, 0], path[:-1, 1], path[1:, 0], path[1:, 1])
+    along = np.concatenate([[0.0], np.cumsum(legs)])
+    samples = np.linspace(0.0, along[-1], max(2, int(along[-1] / step_m) + 1))
+    return np.column_stack(
+        [np.interp(samples, along, path[:, 0]), np.interp(samples, along, path[:, 1])]
+    )
+
+
+def path_overlap(a, b, cell_m: float = 30.0) -> float:
+    """Share of path ``a`` running within about ``cell_m`` meters of path ``b``.
+
+    Both paths are resampled every ``cell_m`` meters and snapped to a grid of
+    ``cell_m`` cells; a point of ``a`` overlaps when its cell or one of the 8
+    neighbouring cells holds a point of ``b``.
+    """
+    a, b = densify(a, cell_m), densify(b, cell_m)
+    if not len(a) or not len(b):
+        return 0.0
+    cos_lat = np.cos(np.radians(a[:, 0].mean()))
+
+    def cells(points):
+        y = np.floor(np.radians(points[:, 0]) * EARTH_RADIUS_M / cell_m)
+        x = np.floor(np.radians(points[:, 1]) * EARTH_RADIUS_M * cos_lat / cell_m)
+        return y.astype(np.int64) * 10_000_000 + x.astype(np.int64)
+
+    shifts = np.array([dy * 10_000_000 + dx for dy in (-1, 0, 1) for dx in (-1, 0, 1)])
+    near = (cells(b)[:, None] + shifts[None, :]).ravel()
+    return float(np.isin(cells(a), near).mean())
+
+
+_GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def geohash_encode(lat: float, lon: float, precision: int = 7) -> str:
+    """Return the geohash of a point (precision 5 ~ 5 km, 6 ~ 1 km, 7 ~ 150 m)."""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, bit_count, even = [], 0, 0, True
+    while len(chars) < precision:
+        rng, value = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        bits <<= 1
+        if value >= mid:
+            bits |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_GEOHASH_ALPHABET[bits])
+            bits, bit_count = 0, 0
+    return "".join(chars)
+
+
+def geohash_cover(
+    bounds: list[float], max_cells: int = 16, max_precision: int = 7
+) -> list[str]:
+    """Return the geohash cells covering ``[min_lat, min_lon, max_lat, max_lon]``.
+
+    The finest precision up to ``max_precision`` needing at most ``max_cells``
+    cells is used, so that the cells can be looked up as geohash prefixes.
+    """
+    min_lat, min_lon, max_lat, max_lon = bounds
+    for precision in range(max_precision, 0, -1):
+        dlat = 180.0 / 2 ** (5 * precision // 2)
+        dlon = 360.0 / 2 ** ((5 * precision + 1) // 2)
+        rows = range(int((min_lat + 90) // dlat), int((max_lat + 90) // dlat) + 1)
+        cols = range(int((min_lon + 180) // dlon), int((max_lon + 180) // dlon) + 1)
+        if len(rows) * len(cols) <= max_cells or precision == 1:
+            break
+    return sorted(
+        {
+            geohash_encode(
+                min(-90 + (row + 0.5) * dlat, 90.0),
+                min(-180 + (col + 0.5) * dlon, 180.0),
+                precision,
+            )
+            for row in rows
+            for col in cols
+        }
+    )
@@ -0,0 +1,166 @@
+"""Shared geocoding service used by the itinerary and weather tools.
+
+Place names are normalized into cache keys and resolved through a bounded
+in-memory LRU backed by a persistent SQLite table, so a place is geocoded
+once. Calls to Nominatim are throttled process-wide to respect its usage
+policy (about one request per second): concurrent users queue instead of
+getting banned.
+"""
+
+import os
+import sqlite3
+import ssl
+import threading
+import time
+import unicodedata
+
+import certifi
+import requests
+
+from .cache import TTLCache
+from .storage import LazyDatabase
+
+USER_AGENT = "chathletique-mcp/0.1"
+NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
+NOT_FOUND_TTL = 3600  # unknown places are remembered in memory only
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS places (
+    query TEXT PRIMARY KEY,
+    lat REAL NOT NULL,
+    lon REAL NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+
+def normalize_query(place_name: str, language: str | None = None) -> str:
+    """Return the cache key of a place: NFKC, case-folded, single-spaced."""
+    text = unicodedata.normalize("NFKC", place_name).casefold()
+    text = " ".join(text.replace(",", " , ").split()).replace(" ,", ",")
+    return f"{text}|{language or ''}"
+
+
+class Geocoder:
+    """Cached and throttled Nominatim geocoder.
+
+    Args:
+        path: SQLite file, defaults to ``geocoding.sqlite3`` in the data dir.
+        maxsize: Number of places kept in memory.
+        min_interval: Minimum seconds between two Nominatim requests
+            (``NOMINATIM_MIN_INTERVAL``, default 1).
+    """
+
+    def __init__(
+        self,
+        path: str | os.PathLike | None = None,
+        maxsize: int = 1024,
+        min_interval: float | None = None,
+    ):
+        self.cache = TTLCache(maxsize=maxsize)
+        self._db = LazyDatabase(path, "geocoding.sqlite3", SCHEMA)
+        self.min_interval = (
+            min_interval
+            if min_interval is not None
+            else float(os.getenv("NOMINATIM_MIN_INTERVAL", "1"))
+        )
+        self._db_lock = threading.Lock()
+        self._throttle_lock = threading.Lock()
+        self._last_request = 0.0
+        self._geolocator = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        return self._db.connection()
+
+    def geocode(
+        self, place_name: str, language: str | None = None
+    ) -> tuple[float, float] | None:
+        """Return the (lat, lon) of a place, or None if Nominatim does not know it.
+
+        Raises:
+            requests.RequestException: Nominatim could not be reached.
+        """
+        key = normalize_query(place_name, language)
+        found, coords = self._cached(key)
+        if found:
+            return coords
+
+        # One request at a time, at most one per min_interval
+        with self._throttle_lock:
+            found, coords = self._cached(key)  # resolved while we were queued
+            if found:
+                return coords
+            wait = self._last_request + self.min_interval - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                coords = self._request(place_name, language)
+            finally:
+                self._last_request = time.monotonic()
+            # Cached before the next queued lookup checks the cache
+            self._store(key, coords)
+        return coords
+
+    def _store(self, key: str, coords: tuple[float, float] | None) -> None:
+        if coords is None:
+            self.cache.set(key, None, ttl=NOT_FOUND_TTL)
+            return
+        self.cache.set(key, coords)
+        with self._db_lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO places VALUES (?, ?, ?, ?)",
+                (key, coords[0], coords[1], time.time()),
+            )
+
+    def _cached(self, key: str) -> tuple[bool, tuple[float, float] | None]:
+        coords = self.cache.get(key, default=False)
+        if coords is not False:
+            return True, coords
+        with self._db_lock:
+            row = self.conn.execute(
+                "SELECT lat, lon FROM places WHERE query = ?", (key,)
+            ).fetchone()
+        if row:
+            self.cache.set(key, tuple(row))
+            return True, tuple(row)
+        return False, None
+
+    def _request(
+        self, place_name: str, language: str | None
+    ) -> tuple[float, float] | None:
+        # geopy is only imported when a place is missing from the caches
+        from geopy.exc import GeocoderServiceError, GeocoderTimedOut  # noqa: PLC0415
+        from geopy.geocoders import Nominatim  # noqa: PLC0415
+
+        if self._geolocator is None:
+            self._geolocator = Nominatim(
+                user_agent=USER_AGENT,
+                timeout=10,
+                ssl_context=ssl.create_default_context(cafile=certifi.where()),
+            )
+        try:
+            loc = self._geolocator.geocode(place_name, language=language or False)
+            return (float(loc.latitude), float(loc.longitude)) if loc else None
+        except (GeocoderTimedOut, GeocoderServiceError):
+            pass
+
+        # Fallback on the raw search endpoint
+        params = {"q": place_name, "format": "json", "limit": 1}
+        if language:
+            params["accept-language"] = language
+        r = requests.get(
+            NOMINATIM_URL,
+            headers={"User-Agent": f"{USER_AGENT} (contact: you@example.com)"},
+            params=params,
+            timeout=10,
+            verify=certifi.where(),
+        )
+        r.raise_for_status()
+        data = r.json()
+        if not data:
+            return None
+        return float(data[0]["lat"]), float(data[0]["lon"])
+
+
+geocoder = Geocoder()
@@ -0,0 +1,36 @@
+"""Shared asynchronous HTTP client for the async tools.
+
+Tools reuse one ``httpx.AsyncClient`` per event loop, so connections to the
+weather and routing APIs stay pooled across calls and concurrent requests
+share the same keep-alive connections.
+"""
+
+import asyncio
+import os
+import weakref
+
+import httpx
+
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "20"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))
+
+# One client per event loop: a client is bound to the loop it was created in.
+# Clients of different loops (server thread, tests) live side by side instead
+# of replacing each other, and go away with their loop.
+_clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Return the pooled client of the running event loop, creating it if needed."""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            timeout=HTTP_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=HTTP_POOL_SIZE,
+                max_keepalive_connections=HTTP_POOL_SIZE,
+            ),
+        )
+        _clients[loop] = client
+    return client
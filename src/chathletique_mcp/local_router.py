@@ -0,0 +1,207 @@
+"""Offline walking router over a compact CSR road graph.
+
+The graph is a set of NumPy arrays: node coordinates and a compressed sparse
+row adjacency (``indptr``, ``indices``, ``weights`` in meters). It is built
+once from an OSM extract (Overpass JSON) or an edge list, saved as ``.npz``
+and queried in-process with A*, so distance estimates of the itinerary
+planner need no network call.
+"""
+
+import heapq
+import json
+import math
+import os
+from itertools import pairwise
+
+import numpy as np
+import polyline
+
+from .geo import EARTH_RADIUS_M, haversine_m
+
+WALKING_SPEED_MS = 1.4  # used to fill the duration like the Routes API does
+
+# OSM highway values a pedestrian cannot use
+NOT_WALKABLE = {"motorway", "motorway_link", "trunk", "trunk_link", "construction"}
+
+# Stops farther than this from every node are outside the graph: the route is
+# left to the online routers instead of starting from a far-away node
+LOCAL_ROUTER_MAX_SNAP_M = float(os.getenv("LOCAL_ROUTER_MAX_SNAP_M", "300"))
+
+
+class RoadGraph:
+    """Walking network stored as compressed sparse rows.
+
+    Args:
+        lat: Latitude of each node, in degrees.
+        lon: Longitude of each node, in degrees.
+        indptr: Row pointers, edges of node ``i`` are ``indptr[i]:indptr[i+1]``.
+        indices: Target node of each edge.
+        weights: Length of each edge in meters.
+        max_snap_m: Largest distance in meters between a stop and its node
+            (``LOCAL_ROUTER_MAX_SNAP_M``, default 300).
+    """
+
+    def __init__(self, lat, lon, indptr, indices, weights, max_snap_m=None):
+        self.max_snap_m = (
+            max_snap_m if max_snap_m is not None else LOCAL_ROUTER_MAX_SNAP_M
+        )
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        self.weights = np.asarray(weights, dtype=np.float32)
+        # Plain lists are much faster than NumPy scalars in the search loop
+        self._indptr = self.indptr.tolist()
+        self._indices = self.indices.tolist()
+        self._weights = self.weights.tolist()
+        self._lat_rad = np.radians(self.lat).tolist()
+        self._lon_rad = np.radians(self.lon).tolist()
+
+    # -------------------------------- Building --------------------------------
+    @classmethod
+    def from_edges(cls, lat, lon, edges, bidirectional: bool = True) -> "RoadGraph":
+        """Build a graph from node coordinates and ``(u, v)`` node index pairs.
+
+        Edge lengths are the great-circle distances between their nodes.
+        """
+        edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+        if bidirectional:
+            edges = np.concatenate([edges, edges[:, ::-1]])
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        src, dst = edges[:, 0], edges[:, 1]
+        weights = haversine_m(lat[src], lon[src], lat[dst], lon[dst])
+
+        order = np.argsort(src, kind="stable")
+        counts = np.bincount(src, minlength=len(lat))
+        indptr = np.concatenate([[0], np.cumsum(counts)])
+        return cls(lat, lon, indptr, dst[order], weights[order])
+
+    @classmethod
+    def from_osm_json(cls, data: dict) -> "RoadGraph":
+        """Build a graph from an Overpass JSON extract of OSM ways and nodes."""
+        coords = {
+            el["id"]: (el["lat"], el["lon"])
+            for el in data.get("elements", [])
+            if el.get("type") == "node"
+        }
+        index: dict[int, int] = {}
+        edges = []
+        for el in data.get("elements", []):
+            tags = el.get("tags", {})
+            if el.get("type") != "way" or "highway" not in tags:
+                continue
+            if tags["highway"] in NOT_WALKABLE or tags.get("foot") == "no":
+                continue
+            nodes = [n for n in el.get("nodes", []) if n in coords]
+            for a, b in pairwise(nodes):
+                edges.append(
+                    (index.setdefault(a, len(index)), index.setdefault(b, len(index)))
+                )
+
+        lat = np.empty(len(index))
+        lon = np.empty(len(index))
+        for osm_id, i in index.items():
+            lat[i], lon[i] = coords[osm_id]
+        return cls.from_edges(lat, lon, edges)
+
+    @classmethod
+    def load(cls, path: str | os.PathLike) -> "RoadGraph":
+        """Load a graph saved with ``save`` or an Overpass ``.json`` extract."""
+        if str(path).endswith(".json"):
+            with open(path, encoding="utf-8") as f:
+                return cls.from_osm_json(json.load(f))
+        with np.load(path) as arrays:
+            return cls(**{name: arrays[name] for name in arrays.files})
+
+    def save(self, path: str | os.PathLike) -> None:
+        np.savez(
+            path,
+            lat=self.lat,
+            lon=self.lon,
+            indptr=self.indptr,
+            indices=self.indices,
+            weights=self.weights,
+        )
+
+    # -------------------------------- Queries --------------------------------
+    def nearest_node(self, lat: float, lon: float) -> int:
+        """Return the index of the node closest to a point."""
+        return int(np.argmin(haversine_m(lat, lon, self.lat, self.lon)))
+
+    def snap(self, lat: float, lon: float) -> int | None:
+        """Return the node of a point, None if it is beyond ``max_snap_m``."""
+        node = self.nearest_node(lat, lon)
+        if haversine_m(lat, lon, self.lat[node], self.lon[node]) > self.max_snap_m:
+            return None
+        return node
+
+    def _heuristic(self, node: int, target: int) -> float:
+        lat1, lon1 = self._lat_rad[node], self._lon_rad[node]
+        lat2, lon2 = self._lat_rad[target], self._lon_rad[target]
+        a = (
+            math.sin((lat2 - lat1) / 2) ** 2
+            + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+        )
+        return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+    def shortest_path(self, source: int, target: int) -> tuple[float, list[int]]:
+        """A* search between two nodes.
+
+        Returns:
+            tuple: Length in meters and list of node indices, ``(inf, [])`` if
+                the nodes are not connected.
+        """
+        dist = {source: 0.0}
+        parent = {source: -1}
+        heap = [(self._heuristic(source, target), 0.0, source)]
+        while heap:
+            _, d, node = heapq.heappop(heap)
+            if node == target:
+                path = [node]
+                while parent[path[-1]] != -1:
+                    path.append(parent[path[-1]])
+                return d, path[::-1]
+            if d > dist.get(node, math.inf):
+                continue
+            for e in range(self._indptr[node], self._indptr[node + 1]):
+                nxt = self._indices[e]
+                nd = d + self._weights[e]
+                if nd < dist.get(nxt, math.inf):
+                    dist[nxt] = nd
+                    parent[nxt] = node
+                    heapq.heappush(heap, (nd + self._heuristic(nxt, target), nd, nxt))
+        return math.inf, []
+
+    def route(self, origin, destination, waypoints=None) -> dict | None:
+        """Route through the given (lat, lon) points, like ``compute_route``.
+
+        Returns:
+            dict | None: distance (m), ISO duration and encoded polyline, or
+                None if a stop is off the graph or a leg cannot be routed on it.
+        """
+        stops = [origin, *(waypoints or []), destination]
+        nodes = [self.snap(float(p[0]), float(p[1])) for p in stops]
+        if None in nodes:
+            return None
+        total = 0.0
+        path: list[int] = [nodes[0]]
+        for a, b in pairwise(nodes):
+            length, leg = self.shortest_path(a, b)
+            if not leg:
+                return None
+            total += length
+            path.extend(leg[1:])
+
+        return {
+            "distance_m": round(total),
+            "duration_iso": f"{int(total / WALKING_SPEED_MS)}s",
+            "encoded_polyline": polyline.encode(
+                list(zip(self.lat[path].tolist(), self.lon[path].tolist()))
+            ),
+        }
+
+    def loop_distance(self, start, waypoints) -> float:
+        """Length in meters of the loop start -> waypoints -> start."""
+        route = self.route(start, start, waypoints)
+        return route["distance_m"] if route else math.inf
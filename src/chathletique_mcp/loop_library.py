@@ -0,0 +1,322 @@
+"""Library of validated running loops for popular start areas.
+
+Loops are stored per start geohash cell (precision 7, about 150 m) and distance
+bucket (whole kilometers) with their waypoints, road distance and polyline.
+``create_itinerary`` serves a random stored loop of the cell when there is one,
+and stores every loop it computes. A background job keeps the places listed in
+``LOOP_LIBRARY_PLACES`` stocked for the distances of ``LOOP_LIBRARY_DISTANCES``.
+Loops expire after ``LOOP_LIBRARY_TTL`` so new segments and closed roads are
+eventually picked up.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections.abc import Callable
+
+import numpy as np
+import polyline
+
+from .geo import geohash_encode, haversine_m, path_overlap
+from .rate_limit import BACKGROUND, priority
+from .storage import LazyDatabase, transaction
+
+CELL_PRECISION = 7
+
+LOOP_LIBRARY_PLACES = [
+    place.strip()
+    for place in os.getenv("LOOP_LIBRARY_PLACES", "").split(";")
+    if place.strip()
+]
+LOOP_LIBRARY_DISTANCES = [
+    int(km) for km in os.getenv("LOOP_LIBRARY_DISTANCES", "5,10,15,21").split(",")
+]
+LOOP_LIBRARY_REFRESH_INTERVAL = float(
+    os.getenv("LOOP_LIBRARY_REFRESH_INTERVAL", str(6 * 3600))
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS loops (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    cell TEXT NOT NULL,
+    distance_km INTEGER NOT NULL,
+    start_lat REAL NOT NULL,
+    start_lon REAL NOT NULL,
+    waypoints TEXT NOT NULL,
+    distance_m REAL NOT NULL,
+    polyline TEXT,
+    created_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS loops_by_cell ON loops (cell, distance_km, expires_at);
+"""
+
+
+def cell_key(lat: float, lon: float) -> str:
+    """Return the library cell of a start point."""
+    return geohash_encode(lat, lon, CELL_PRECISION)
+
+
+def loop_path(loop: dict) -> list[tuple[float, float]]:
+    """Points of a loop: its decoded polyline, or its waypoints without one."""
+    if loop.get("polyline"):
+        return polyline.decode(loop["polyline"])
+    return [loop["start"], *loop["waypoints"], loop["start"]]
+
+
+def loop_key(loop: dict) -> tuple:
+    """Identify a loop by its waypoints, rounded to about a meter."""
+    return tuple((round(lat, 5), round(lon, 5)) for lat, lon in loop["waypoints"])
+
+
+def rank_loops(
+    loops: list[dict],
+    distance_m: float,
+    k: int,
+    tolerance: float = 100.0,
+    max_climb_m: float | None = None,
+) -> list[dict]:
+    """Pick the ``k`` best loops, best first.
+
+    A loop scores its distance error in units of ``tolerance``, minus the share
+    of the loop run on its segment (the first four waypoints), plus its largest
+    overlap with the loops already picked, so that alternatives differ. Loops
+    with the same waypoints are only kept once. With ``max_climb_m``, loops
+    whose ``elevation_gain_m`` is higher are dropped and the others also score
+    their gain in units of ``max_climb_m``.
+
+    Args:
+        loops: Loops with ``start``, ``waypoints``, ``distance_m``,
+            ``polyline`` (the waypoints are used when it is missing) and
+            optionally ``elevation_gain_m``.
+        distance_m: Requested loop distance in meters.
+        k: Number of loops to return.
+        tolerance: Distance error that costs as much as a fully overlapping loop.
+        max_climb_m: Maximum elevation gain in meters.
+
+    Returns:
+        list[dict]: At most ``k`` loops.
+    """
+    unique = list(
+        {
+            loop_key(loop): loop
+            for loop in loops
+            if max_climb_m is None
+            or loop.get("elevation_gain_m") is None
+            or loop["elevation_gain_m"] <= max_climb_m
+        }.values()
+    )
+    paths, base = [], []
+    for loop in unique:
+        path = loop_path(loop)
+        segment = np.asarray(loop["waypoints"][:4], dtype=np.float64)
+        segment_m = haversine_m(
+            segment[:-1, 0], segment[:-1, 1], segment[1:, 0], segment[1:, 1]
+        ).sum()
+        paths.append(path)
+        score = abs(loop["distance_m"] - distance_m) / tolerance - min(
+            1.0, segment_m / max(loop["distance_m"], 1.0)
+        )
+        if max_climb_m and loop.get("elevation_gain_m") is not None:
+            score += loop["elevation_gain_m"] / max_climb_m
+        base.append(score)
+
+    picked: list[int] = []
+    overlap = np.zeros(len(unique))
+    while len(picked) < min(k, len(unique)):
+        scores = np.array(base) + overlap
+        scores[picked] = np.inf
+        best = int(np.argmin(scores))
+        picked.append(best)
+        for i in range(len(unique)):
+            if i not in picked:
+                overlap[i] = max(overlap[i], path_overlap(paths[i], paths[best]))
+    return [unique[i] for i in picked]
+
+
+class LoopLibrary:
+    """SQLite library of loops keyed by start cell and distance bucket.
+
+    Args:
+        path: SQLite file, defaults to ``loops.sqlite3`` in the data dir.
+        ttl: Seconds a loop is served (``LOOP_LIBRARY_TTL``, default 7 days).
+        per_cell: Loops the background job keeps per cell and distance
+            (``LOOP_LIBRARY_PER_CELL``, default 5).
+        max_per_cell: Loops kept per cell and distance, the oldest are dropped
+            (``LOOP_LIBRARY_MAX_PER_CELL``, default 20).
+    """
+
+    def __init__(
+        self,
+        path: str | os.PathLike | None = None,
+        ttl: float | None = None,
+        per_cell: int | None = None,
+        max_per_cell: int | None = None,
+    ):
+        self._db = LazyDatabase(path, "loops.sqlite3", SCHEMA)
+        self.ttl = (
+            ttl
+            if ttl is not None
+            else float(os.getenv("LOOP_LIBRARY_TTL", str(7 * 24 * 3600)))
+        )
+        self.per_cell = per_cell or int(os.getenv("LOOP_LIBRARY_PER_CELL", "5"))
+        self.max_per_cell = max_per_cell or int(
+            os.getenv("LOOP_LIBRARY_MAX_PER_CELL", "20")
+        )
+        self._lock = threading.Lock()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        return self._db.connection()
+
+    def lookup(self, start: tuple[float, float], distance_km: float) -> dict | None:
+        """Return a random valid loop of the start cell and distance, or None.
+
+        Returns:
+            dict | None: ``start``, ``waypoints``, ``distance_m`` and ``polyline``
+                of the stored loop.
+        """
+        loops = self.sample(start, distance_km)
+        return loops[0] if loops else None
+
+    def sample(
+        self, start: tuple[float, float], distance_km: float, k: int = 1
+    ) -> list[dict]:
+        """Return up to ``k`` distinct random valid loops, like ``lookup``."""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT start_lat, start_lon, waypoints, distance_m, polyline "
+                "FROM loops WHERE cell = ? AND distance_km = ? AND expires_at > ? "
+                "ORDER BY RANDOM() LIMIT ?",
+                (cell_key(*start), round(distance_km), time.time(), k),
+            ).fetchall()
+        return [
+            {
+                "start": (start_lat, start_lon),
+                "waypoints": [tuple(p) for p in json.loads(waypoints)],
+                "distance_m": distance_m,
+                "polyline": encoded,
+            }
+            for start_lat, start_lon, waypoints, distance_m, encoded in rows
+        ]
+
+    def count(self, start: tuple[float, float], distance_km: float) -> int:
+        """Number of valid loops stored for the start cell and distance."""
+        with self._lock:
+            (n,) = self.conn.execute(
+                "SELECT COUNT(*) FROM loops "
+                "WHERE cell = ? AND distance_km = ? AND expires_at > ?",
+                (cell_key(*start), round(distance_km), time.time()),
+            ).fetchone()
+        return n
+
+    def store(self, start: tuple[float, float], distance_km: float, loop: dict) -> None:
+        """Store a validated loop (``waypoints``, ``distance_m``, ``polyline``)."""
+        now = time.time()
+        cell, bucket = cell_key(*start), round(distance_km)
+        with self._lock, transaction(self.conn):
+            self.conn.execute(
+                "INSERT INTO loops (cell, distance_km, start_lat, start_lon, "
+                "waypoints, distance_m, polyline, created_at, expires_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    cell,
+                    bucket,
+                    float(start[0]),
+                    float(start[1]),
+                    json.dumps(
+                        [[float(lat), float(lon)] for lat, lon in loop["waypoints"]]
+                    ),
+                    float(loop["distance_m"]),
+                    loop.get("polyline"),
+                    now,
+                    now + self.ttl,
+                ),
+            )
+            self.conn.execute(
+                "DELETE FROM loops WHERE cell = ? AND distance_km = ? AND id NOT IN "
+                "(SELECT id FROM loops WHERE cell = ? AND distance_km = ? "
+                "ORDER BY created_at DESC LIMIT ?)",
+                (cell, bucket, cell, bucket, self.max_per_cell),
+            )
+
+    def purge(self) -> int:
+        """Delete the expired loops and return how many were deleted."""
+        with self._lock:
+            cursor = self.conn.execute(
+                "DELETE FROM loops WHERE expires_at <= ?", (time.time(),)
+            )
+        return cursor.rowcount
+
+    def refresh(
+        self,
+        places: list[str],
+        distances: list[int],
+        build: Callable[[tuple[float, float], int], dict | None],
+        geocode: Callable[[str], tuple[float, float] | None],
+    ) -> int:
+        """Stock every place and distance with ``per_cell`` valid loops.
+
+        Args:
+            places: Place names of the popular start areas.
+            distances: Loop distances in km.
+            build: Computes a loop from a start point and a distance in meters,
+                None if no loop could be found.
+            geocode: Resolves a place name to (lat, lon), None if unknown.
+
+        Returns:
+            int: Number of loops added.
+        """
+        added = 0
+        for place in places:
+            start = geocode(place)
+            if start is None:
+                print(f"Loop library: unknown place {place}")
+                continue
+            for distance_km in distances:
+                for _ in range(self.per_cell - self.count(start, distance_km)):
+                    loop = build(start, int(distance_km) * 1000)
+                    if loop is None:  # the area has no more loops to offer
+                        break
+                    self.store(start, distance_km, loop)
+                    added += 1
+        return added
+
+    def start_refresh(
+        self,
+        build: Callable[[tuple[float, float], int], dict | None],
+        geocode: Callable[[str], tuple[float, float] | None],
+        places: list[str] | None = None,
+        distances: list[int] | None = None,
+        interval: float | None = None,
+    ) -> threading.Thread | None:
+        """Run ``refresh`` every ``interval`` seconds in a daemon thread.
+
+        The Strava calls of the job run with the background priority, so they
+        never use the budget reserved for interactive tools.
+
+        Returns:
+            threading.Thread | None: The job, None if no place is configured.
+        """
+        places = LOOP_LIBRARY_PLACES if places is None else places
+        distances = distances or LOOP_LIBRARY_DISTANCES
+        interval = interval or LOOP_LIBRARY_REFRESH_INTERVAL
+        if not places:
+            return None
+
+        def run():
+            while True:
+                try:
+                    with priority(BACKGROUND):
+                        purged = self.purge()
+                        added = self.refresh(places, distances, build, geocode)
+                    print(f"Loop library: {added} loops added, {purged} expired")
+                except Exception as e:
+                    print(f"Error refreshing the loop library: {e}")
+                time.sleep(interval)
+
+        thread = threading.Thread(target=run, name="loop-library", daemon=True)
+        thread.start()
+        return thread
@@ -1,7 +1,22 @@
 """MCP Server Template"""
 
+import os
+
 # Import modules containing MCP tools to register them
-from .mcp_utils import auth, mcp
+from .mcp_utils import auth_app, mcp
+
+# Number of MCP worker processes sharing port 3000. With more than one, the
+# tokens and OAuth flows are kept in the SQLite state store so that every
+# worker sees them.
+MCP_WORKERS = int(os.getenv("MCP_WORKERS", "1"))
+
+
+def create_app():
+    """Build the MCP app of one worker process (uvicorn factory)."""
+    from . import strava_tools, weather_tools  # noqa: F401 (register the tools)
+
+    # Stateless: any worker can serve any request, no session to share
+    return mcp.http_app(transport="streamable-http", stateless_http=True)
 
 
 def main():
@@ -10,6 +25,34 @@ def main():
     # Don't deploy in prod
     import threading
 
+    import uvicorn
+
+    from . import weather_tools  # noqa: F401 (register the tools)
+    from .strava_tools import start_loop_library_refresh
+    from .token_registry import token_registry
+
+    if MCP_WORKERS > 1:
+        # Inherited by the worker processes; the auth app below uses it too
+        os.environ.setdefault("STATE_STORE", "sqlite")
+
+    # Keep the loops of the popular start places (LOOP_LIBRARY_PLACES) stocked
+    start_loop_library_refresh()
+    # Refresh the athletes' Strava tokens before they expire
+    token_registry.start_refresh()
+
+    if MCP_WORKERS > 1:
+        # FastAPI auth server in another thread, MCP workers supervised here
+        threading.Thread(
+            target=lambda: uvicorn.run(auth_app, port=8000), daemon=True
+        ).start()
+        uvicorn.run(
+            "chathletique_mcp.main:create_app",
+            factory=True,
+            port=3000,
+            workers=MCP_WORKERS,
+        )
+        return
+
     # Start MCP server in another thread
     threading.Thread(
         target=lambda: mcp.run(
@@ -19,9 +62,7 @@ def main():
     ).start()
 
     # Run FastAPI server (blocks main thread)
-    import uvicorn
-
-    uvicorn.run(auth, port=8000)
+    uvicorn.run(auth_app, port=8000)
 
 
 if __name__ == "__main__":
@@ -1,18 +1,31 @@
-"""MCP utilities for Strava coaching server."""
+"""MCP utilities for Strava coaching server.
 
+The OAuth proxy keeps its clients, flows and tokens in the shared state store,
+so any worker can serve any step of the OAuth flow (``MCP_WORKERS > 1`` needs
+a shared ``STATE_STORE``, which main() selects). The Strava tokens it issues
+are registered per athlete in the token registry, which refreshes them for the
+tools; the bearer token of the MCP client itself is only refreshed when the
+client asks the proxy for a new one.
+"""
+
+import hashlib
 import os
 
 import httpx
-from dotenv import load_dotenv
 from fastapi import FastAPI, HTTPException, Request
 from fastmcp import FastMCP
-from fastmcp.server.auth.oauth import AccessToken, TokenVerifier
-from fastmcp.server.auth.oauth_proxy import OAuthProxy
-
-mcp = FastMCP("Chathletique MCP Server", port=3000, stateless_http=True, debug=True)
-
-load_dotenv()
-
+from fastmcp.server.auth import AccessToken, TokenVerifier
+from fastmcp.server.auth.oauth_proxy import OAuthProxy, ProxyDCRClient
+from fastmcp.server.dependencies import get_access_token
+from mcp.server.auth.provider import RefreshToken
+from starlette.responses import PlainTextResponse
+
+from .cache import TTLCache
+from .http_client import get_async_client
+from .rate_limit import governor
+from .singleflight import SingleFlight
+from .state_store import StoreMapping, get_state_store
+from .token_registry import token_registry
 
 # Strava OAuth config
 STRAVA_CLIENT_ID = os.getenv("STRAVA_CLIENT_ID")
@@ -20,29 +33,45 @@ STRAVA_CLIENT_SECRET = os.getenv("STRAVA_CLIENT_SECRET")
 BASE_URL = "https://gorilla-major-literally.ngrok-free.app"
 REDIRECT_URI = "https://gorilla-major-literally.ngrok-free.app/auth/callback"
 
-# Store user tokens in memory (for demo; use a DB in production)
-user_tokens = {}
-current_user_token = None  # Simple single-user token storage
+# User tokens live in the per-athlete token registry, backed by the shared state
+# store (STATE_STORE) so that every worker process sees them
+OAUTH = "oauth"
+# Seconds an OAuth flow (transaction, then client code) may take
+OAUTH_FLOW_TTL = 600
 
-auth = FastAPI()
+auth_app = FastAPI()
 
 
 def get_current_token():
-    """Get the current user's Strava access token."""
-    global current_user_token  # noqa
-    if current_user_token:
-        return current_user_token
-
-    # Fallback: try to get from environment (for dev)
-    token = os.getenv("STRAVA_ACCESS_TOKEN")
+    """Get the Strava access token of the athlete calling the tool."""
+    access = get_access_token()
+    if access is not None:
+        # Authenticated request: the registry holds the athlete's freshest token
+        athlete_id = access.claims.get("athlete_id")
+        token = token_registry.get(athlete_id) if athlete_id is not None else None
+        return token or access.token
+
+    # Unauthenticated transport (dev): the athlete of the last OAuth callback
+    last_athlete = get_state_store().get(OAUTH, "last_athlete")
+    token = token_registry.get(last_athlete) if last_athlete is not None else None
     if token:
-        current_user_token = token
         return token
 
-    return None
+    # Fallback: try to get from environment (for dev)
+    return os.getenv("STRAVA_ACCESS_TOKEN")
+
 
+def current_token_identity() -> str | None:
+    """Hash of the Strava token the tools use for the caller, None without one.
 
-@auth.get("/auth/strava")
+    Keys the caller's shared tool results on the token that actually
+    produces them.
+    """
+    token = get_current_token()
+    return hashlib.sha256(token.encode()).hexdigest() if token else None
+
+
+@auth_app.get("/auth/strava")
 async def auth_strava():
     """Redirect user to Strava for OAuth authorization."""
     auth_url = (
@@ -55,11 +84,9 @@ async def auth_strava():
     return {"url": auth_url}
 
 
-@auth.get("/auth/callback")
+@auth_app.get("/auth/callback")
 async def callback(request: Request):
     """Handle Strava OAuth callback and store user token."""
-    global current_user_token  # noqa
-
     code = request.query_params.get("code")
     if not code:
         raise HTTPException(status_code=400, detail="Missing authorization code")
@@ -80,9 +107,11 @@ async def callback(request: Request):
         token_data = response.json()
         access_token = token_data["access_token"]
 
-        # Store token globally for MCP tools to use
-        current_user_token = access_token
-        user_tokens[access_token] = token_data
+        # Store the whole token response (refresh token, expiry) per athlete
+        athlete_id = (token_data.get("athlete") or {}).get("id")
+        if athlete_id is not None:
+            token_registry.put(athlete_id, token_data)
+            get_state_store().set(OAUTH, "last_athlete", athlete_id)
 
         return {"status": "success", "access_token": access_token}
 
@@ -91,37 +120,109 @@ class StravaTokenVerifier(TokenVerifier):
     """
     Minimal verifier for opaque Strava tokens.
     Strategy: call GET /api/v3/athlete; 200 => valid token.
+    Verified tokens are cached for VERIFIED_TOKEN_TTL seconds (default 300) and
+    rejected ones for REJECTED_TOKEN_TTL (default 30); concurrent
+    verifications of the same token share one Strava call.
     """
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.verified_ttl = float(os.getenv("VERIFIED_TOKEN_TTL", "300"))
+        self.rejected_ttl = float(os.getenv("REJECTED_TOKEN_TTL", "30"))
+        self.cache = TTLCache(maxsize=4096, ttl=self.verified_ttl)
+        self._singleflight = SingleFlight()
+
     async def verify_token(self, token: str) -> AccessToken | None:
         if not token:
             return None
 
+        key = hashlib.sha256(token.encode()).hexdigest()  # no raw token as key
+        cached = self.cache.get(key, default=False)
+        if cached is not False:
+            return cached
+        return await self._singleflight.do(key, lambda: self._verify(key, token))
+
+    async def _verify(self, key: str, token: str) -> AccessToken | None:
         try:
-            async with httpx.AsyncClient(timeout=6) as cx:
-                r = await cx.get(
-                    "https://www.strava.com/api/v3/athlete",
-                    headers={"Authorization": f"Bearer {token}"},
-                )
+            r = await get_async_client().get(
+                "https://www.strava.com/api/v3/athlete",
+                headers={"Authorization": f"Bearer {token}"},
+                timeout=6,
+            )
         except httpx.HTTPError:
-            return None
+            return None  # not cached, Strava may be back on the next call
 
+        governor.update(r.headers, r.status_code)
+        if r.status_code in (401, 403):
+            self.cache.set(key, None, ttl=self.rejected_ttl)
+            return None
         if r.status_code != 200:
             return None
 
         me = r.json()  # includes id, username, etc.
         # Return the smallest valid AccessToken object
-        return AccessToken(
+        access_token = AccessToken(
             token=token,
-            # subject/client identifiers are optional; include athlete id for convenience
-            subject=str(me.get("id")) if "id" in me else None,
+            client_id=str(me.get("id")),
             scopes=[],  # Strava doesn't expose scopes post-exchange
             expires_at=None,  # let the OAuth client handle refresh
-            extra={"athlete_id": me.get("id")},
+            # the athlete id keys the per-athlete token registry
+            claims={"sub": str(me.get("id")), "athlete_id": me.get("id")},
         )
+        self.cache.set(key, access_token)
+        return access_token
+
+
+def _model_mapping(namespace: str, model) -> StoreMapping:
+    """Shared mapping of pydantic models."""
+    return StoreMapping(
+        namespace,
+        dump=lambda value: value.model_dump(mode="json"),
+        load=model.model_validate,
+    )
 
 
-auth = OAuthProxy(
+class SharedOAuthProxy(OAuthProxy):
+    """OAuthProxy keeping its state in the shared state store.
+
+    The upstream proxy holds registered clients, pending flows and issued
+    tokens in dicts of the process; every worker would then only know the
+    flows it started itself.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._clients = StoreMapping(
+            "oauth_clients",
+            dump=lambda client: client.model_dump(mode="json"),
+            load=lambda data: ProxyDCRClient(
+                **data,
+                allowed_redirect_uri_patterns=self._allowed_client_redirect_uris,
+            ),
+        )
+        self._access_tokens = _model_mapping("oauth_access_tokens", AccessToken)
+        self._refresh_tokens = _model_mapping("oauth_refresh_tokens", RefreshToken)
+        self._access_to_refresh = StoreMapping("oauth_access_to_refresh")
+        self._refresh_to_access = StoreMapping("oauth_refresh_to_access")
+        self._oauth_transactions = StoreMapping(
+            "oauth_transactions", ttl=OAUTH_FLOW_TTL
+        )
+        self._client_codes = StoreMapping("oauth_client_codes", ttl=OAUTH_FLOW_TTL)
+
+    async def exchange_authorization_code(self, client, authorization_code):
+        """Hand out the Strava tokens of the flow, registering them per athlete."""
+        code_data = self._client_codes.get(authorization_code.code)
+        token = await super().exchange_authorization_code(client, authorization_code)
+        idp_tokens = code_data["idp_tokens"]
+        athlete_id = (idp_tokens.get("athlete") or {}).get("id")
+        if athlete_id is not None:
+            token_registry.put(athlete_id, idp_tokens)
+        return token
+
+
+token_verifier = StravaTokenVerifier()
+
+auth = SharedOAuthProxy(
     # Provider's OAuth endpoints (from their documentation)
     upstream_authorization_endpoint="https://www.strava.com/oauth/authorize",
     upstream_token_endpoint="https://www.strava.com/oauth/token",  # noqa
@@ -129,9 +230,17 @@ auth = OAuthProxy(
     upstream_client_id=STRAVA_CLIENT_ID,
     upstream_client_secret=STRAVA_CLIENT_SECRET,
     # Token validation (see Token Verification guide)
-    token_verifier=StravaTokenVerifier(),
+    token_verifier=token_verifier,
     # Your FastMCP server's public URL
     base_url=BASE_URL,
 )
 
-mcp = FastMCP("Chatletique MCP Server", port=3000, debug=True)
+# The auth provider authenticates every MCP request, so that the tools see the
+# athlete of the bearer token (get_access_token) and use their own Strava token
+mcp = FastMCP("Chathletique MCP Server", port=3000, debug=True, auth=auth)
+
+
+@mcp.custom_route("/metrics", methods=["GET"])
+async def metrics(request: Request) -> PlainTextResponse:
+    """Expose the Strava rate-limit counters for scraping."""
+    return PlainTextResponse(governor.render_metrics())
@@ -0,0 +1,203 @@
+"""Process-wide governor for the Strava API rate limits.
+
+Strava enforces a 15-minute and a daily request budget, reported on every
+response in the ``X-RateLimit-*`` (and ``X-ReadRateLimit-*`` for reads)
+headers. The governor keeps one token bucket per window, refilled when the
+window resets and resynchronised from the headers, and admits a request only if
+its priority may still spend from both buckets. Background work is kept out of
+the last ``reserve`` fraction of each budget so interactive tools never starve.
+When a budget is spent the request fails fast with a retry-after hint instead
+of earning a 429.
+"""
+
+import contextvars
+import math
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+import requests
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+
+SHORT_WINDOW = 15 * 60  # Strava resets the short budget every quarter hour (UTC)
+LONG_WINDOW = 24 * 60 * 60  # and the daily budget at midnight UTC
+
+_priority: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "strava_priority", default=INTERACTIVE
+)
+
+
+class RateLimitError(Exception):
+    """Raised instead of calling Strava when the request budget is spent."""
+
+    def __init__(self, retry_after: float, window: str):
+        self.retry_after = retry_after
+        self.window = window
+        super().__init__(
+            f"Strava {window} rate limit reached, retry after {math.ceil(retry_after)} s"
+        )
+
+
+@contextmanager
+def priority(level: str):
+    """Run the Strava calls of the enclosed block with the given priority.
+
+    Args:
+        level: ``INTERACTIVE`` (default for tool calls) or ``BACKGROUND``.
+    """
+    reset_token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(reset_token)
+
+
+class _Bucket:
+    """Token bucket for one fixed Strava window."""
+
+    def __init__(self, name: str, period: int, limit: int):
+        self.name = name
+        self.period = period
+        self.limit = limit
+        self.usage = 0
+        self.window = None
+
+    def roll(self, now: float) -> None:
+        window = int(now // self.period)
+        if window != self.window:
+            self.window = window
+            self.usage = 0
+
+    def retry_after(self, now: float) -> float:
+        return (self.window + 1) * self.period - now
+
+
+class RateLimitGovernor:
+    """Token-bucket governor shared by every tool and user of the process.
+
+    Args:
+        short_limit: 15-minute budget until the headers report the real one.
+        long_limit: Daily budget until the headers report the real one.
+        reserve: Fraction of each budget only interactive calls may use
+            (``STRAVA_RATE_LIMIT_RESERVE``, default 0.2).
+        max_wait: Interactive calls wait for a window reset at most this many
+            seconds before failing (``STRAVA_RATE_LIMIT_MAX_WAIT``, default 2).
+        clock: Time source, for tests.
+    """
+
+    def __init__(
+        self,
+        short_limit: int = 200,
+        long_limit: int = 2000,
+        reserve: float | None = None,
+        max_wait: float | None = None,
+        clock=time.time,
+    ):
+        self.short = _Bucket("15-minute", SHORT_WINDOW, short_limit)
+        self.long = _Bucket("daily", LONG_WINDOW, long_limit)
+        self.reserve = (
+            reserve
+            if reserve is not None
+            else float(os.getenv("STRAVA_RATE_LIMIT_RESERVE", "0.2"))
+        )
+        self.max_wait = (
+            max_wait
+            if max_wait is not None
+            else float(os.getenv("STRAVA_RATE_LIMIT_MAX_WAIT", "2"))
+        )
+        self.clock = clock
+        self.counters: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def acquire(self, level: str | None = None) -> None:
+        """Take one request from both budgets or raise ``RateLimitError``."""
+        level = level or _priority.get()
+        while True:
+            with self._lock:
+                now = self.clock()
+                blocked = None
+                for bucket in (self.short, self.long):
+                    bucket.roll(now)
+                    share = 1.0 if level == INTERACTIVE else 1.0 - self.reserve
+                    if bucket.usage >= int(bucket.limit * share):
+                        blocked = bucket
+                if blocked is None:
+                    self.short.usage += 1
+                    self.long.usage += 1
+                    self.counters[f"requests_{level}"] += 1
+                    return
+                retry_after = blocked.retry_after(now)
+                if level != INTERACTIVE or retry_after > self.max_wait:
+                    self.counters[f"throttled_{level}"] += 1
+                    raise RateLimitError(retry_after, blocked.name)
+            time.sleep(retry_after)
+
+    def update(self, headers, status_code: int = 200, method: str = "GET") -> None:
+        """Resynchronise the buckets from the rate-limit headers of a response."""
+        read = "X-ReadRateLimit-Usage" in headers and method.upper() == "GET"
+        prefix = "X-ReadRateLimit" if read else "X-RateLimit"
+        usage, limit = headers.get(f"{prefix}-Usage"), headers.get(f"{prefix}-Limit")
+
+        with self._lock:
+            now = self.clock()
+            self.short.roll(now)
+            self.long.roll(now)
+            if usage and limit:
+                try:
+                    short_usage, long_usage = (int(v) for v in usage.split(","))
+                    short_limit, long_limit = (int(v) for v in limit.split(","))
+                except ValueError:
+                    return
+                self.short.limit, self.long.limit = short_limit, long_limit
+                # Keep local counts of requests still in flight
+                self.short.usage = max(self.short.usage, short_usage)
+                self.long.usage = max(self.long.usage, long_usage)
+            if status_code == 429:
+                self.counters["responses_429"] += 1
+                self.short.usage = max(self.short.usage, self.short.limit)
+
+    def metrics(self) -> dict[str, float]:
+        """Return the counters and current budget usage."""
+        with self._lock:
+            now = self.clock()
+            self.short.roll(now)
+            self.long.roll(now)
+            return {
+                **self.counters,
+                "short_usage": self.short.usage,
+                "short_limit": self.short.limit,
+                "long_usage": self.long.usage,
+                "long_limit": self.long.limit,
+            }
+
+    def render_metrics(self) -> str:
+        """Return the metrics in the Prometheus text exposition format."""
+        return "".join(
+            f"strava_rate_limit_{name} {value}\n"
+            for name, value in sorted(self.metrics().items())
+        )
+
+
+governor = RateLimitGovernor()
+
+
+class GovernedSession(requests.Session):
+    """``requests.Session`` admitting every Strava API call through the governor."""
+
+    def __init__(self, rate_governor: RateLimitGovernor | None = None):
+        super().__init__()
+        self.governor = rate_governor or governor
+
+    def request(self, method, url, *args, **kwargs):
+        if not (urlparse(url).hostname or "").endswith("strava.com"):
+            return super().request(method, url, *args, **kwargs)
+
+        self.governor.acquire()
+        response = super().request(method, url, *args, **kwargs)
+        self.governor.update(response.headers, response.status_code, method)
+        return response
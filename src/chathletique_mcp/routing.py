@@ -0,0 +1,232 @@
+"""Route computations used by the itinerary planner."""
+
+import contextvars
+import os
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import TYPE_CHECKING
+
+import requests
+
+from .cache import TTLCache
+from .local_router import RoadGraph
+
+if TYPE_CHECKING:
+    import openrouteservice
+
+# -------------------------------- Globals --------------------------------
+google_api_key = os.getenv("GOOGLE_MAPS_API_KEY")
+ors_api_key = os.getenv("ORS_KEY")
+ROUTES_URL = (
+    "https://routes.googleapis.com/directions/v2:computeRoutes"  # Google Map URL
+)
+
+# Routes are memoized on coordinates rounded to ROUTE_CACHE_PRECISION decimals
+# (4 decimals ~ 11 m), so the bisection of create_itinerary and overlapping
+# itinerary requests reuse the distances already paid for.
+ROUTE_CACHE_PRECISION = int(os.getenv("ROUTE_CACHE_PRECISION", "4"))
+route_cache = TTLCache(
+    maxsize=int(os.getenv("ROUTE_CACHE_SIZE", "4096")),
+    ttl=float(os.getenv("ROUTE_CACHE_TTL", str(7 * 24 * 3600))),
+)
+
+# Optional offline walking graph (.npz or Overpass .json), see local_router.py
+LOCAL_ROUTER_GRAPH = os.getenv("LOCAL_ROUTER_GRAPH")
+_local_router: RoadGraph | None = None
+_local_router_lock = threading.Lock()
+
+
+# Maximum number of locations of one ORS matrix request (sources + destination)
+ORS_MATRIX_MAX_LOCATIONS = int(os.getenv("ORS_MATRIX_MAX_LOCATIONS", "50"))
+_client_ors: "openrouteservice.Client | None" = None
+
+
+class RouteCallCounter:
+    """Upstream routing requests made within a ``count_route_calls`` block.
+
+    Only the requests actually sent are counted: memoized routes and the
+    local graph cost nothing, and each matrix chunk is one request.
+    """
+
+    def __init__(self):
+        self.calls: Counter[str] = Counter()  # by backend
+        self._lock = threading.Lock()
+
+    def add(self, backend: str) -> None:
+        with self._lock:
+            self.calls[backend] += 1
+
+    @property
+    def total(self) -> int:
+        return sum(self.calls.values())
+
+
+_route_calls: contextvars.ContextVar[RouteCallCounter | None] = contextvars.ContextVar(
+    "route_calls", default=None
+)
+
+
+@contextmanager
+def count_route_calls():
+    """Count the upstream routing requests of the block, workers included.
+
+    ``fan_out`` workers run in a copy of the caller's context, so their
+    requests are counted too.
+
+    Yields:
+        RouteCallCounter: Requests by backend (``google``, ``ors_matrix``).
+    """
+    counter = RouteCallCounter()
+    token = _route_calls.set(counter)
+    try:
+        yield counter
+    finally:
+        _route_calls.reset(token)
+
+
+def _record_route_call(backend: str) -> None:
+    counter = _route_calls.get()
+    if counter is not None:
+        counter.add(backend)
+
+
+def get_ors_client() -> "openrouteservice.Client | None":
+    """Return the openrouteservice client, or None if ORS_KEY is not set."""
+    global _client_ors  # noqa
+    if ors_api_key and _client_ors is None:
+        import openrouteservice  # noqa: PLC0415 (slow import, deferred to first use)
+
+        _client_ors = openrouteservice.Client(key=ors_api_key)
+    return _client_ors
+
+
+def get_local_router() -> RoadGraph | None:
+    """Return the offline walking graph, loaded on first use, if one is configured."""
+    global _local_router  # noqa
+    if LOCAL_ROUTER_GRAPH and _local_router is None:
+        with _local_router_lock:
+            if _local_router is None:
+                _local_router = RoadGraph.load(LOCAL_ROUTER_GRAPH)
+    return _local_router
+
+
+def route_key(
+    origin, destination, waypoints=None, mode="WALK", precision=None
+) -> tuple:
+    """Return the memoization key of a route: quantized coordinates and mode."""
+    precision = ROUTE_CACHE_PRECISION if precision is None else precision
+
+    def q(pt):
+        return (round(float(pt[0]), precision), round(float(pt[1]), precision))
+
+    return (
+        q(origin),
+        q(destination),
+        tuple(q(w) for w in waypoints or ()),
+        mode.upper(),
+    )
+
+
+def compute_route(
+    origin, destination, waypoints=None, mode="WALK", api_key=None
+) -> dict:
+    """
+    origin, destination, waypoints: (lat, lon)
+    mode: "WALK" | "DRIVE" | "BICYCLE" | "TWO_WHEELER"
+    Retourne dict avec distance (m), durée ISO, et polyline encodée.
+    """
+    key = route_key(origin, destination, waypoints, mode)
+    route = route_cache.get(key)
+    if route is None:
+        router = get_local_router() if mode.upper() == "WALK" else None
+        if router is not None:
+            route = router.route(origin, destination, waypoints)
+        if route is None:  # no local graph, or the points are not connected on it
+            _record_route_call("google")
+            route = _request_route(
+                origin, destination, waypoints, mode, api_key or google_api_key
+            )
+        route_cache.set(key, route)
+    return route
+
+
+def _request_route(origin, destination, waypoints, mode, api_key) -> dict:
+    """Call the Google Routes API."""
+    headers = {
+        "Content-Type": "application/json",
+        "X-Goog-Api-Key": api_key,
+        "X-Goog-FieldMask": "routes.distanceMeters,routes.duration,routes.polyline.encodedPolyline",
+    }
+
+    def ll(pt):  # (lat, lon) -> payload Routes API
+        return {
+            "location": {
+                "latLng": {"latitude": float(pt[0]), "longitude": float(pt[1])}
+            }
+        }
+
+    body = {
+        "origin": ll(origin),
+        "destination": ll(destination),
+        "travelMode": mode.upper(),
+    }
+    if waypoints:
+        body["intermediates"] = [ll(w) for w in waypoints]
+
+    r = requests.post(ROUTES_URL, headers=headers, json=body, timeout=20)
+    if r.status_code != 200:
+        raise RuntimeError(f"Routes API {r.status_code}: {r.text}")
+
+    route = r.json()["routes"][0]
+
+    return {
+        "distance_m": route["distanceMeters"],
+        "duration_iso": route["duration"],
+        "encoded_polyline": route["polyline"]["encodedPolyline"],
+    }
+
+
+def distances_to(
+    sources, destination, profile="foot-walking", max_locations=None
+) -> list[float | None]:
+    """Road distances from many (lat, lon) sources to one destination.
+
+    All the distances come from openrouteservice matrix requests, one round
+    trip per ``max_locations - 1`` sources, and are memoized like routes.
+
+    Returns:
+        list[float | None]: Distance in meters per source, None if unroutable.
+
+    Raises:
+        RuntimeError: ORS_KEY is not set.
+    """
+    client = get_ors_client()
+    if client is None:
+        raise RuntimeError("ORS_KEY is not set")
+    max_locations = max_locations or ORS_MATRIX_MAX_LOCATIONS
+
+    keys = [route_key(src, destination, mode=f"matrix:{profile}") for src in sources]
+    distances = [route_cache.get(key) for key in keys]
+    missing = [i for i, d in enumerate(distances) if d is None]
+
+    chunk_size = max_locations - 1
+    for first in range(0, len(missing), chunk_size):
+        chunk = missing[first : first + chunk_size]
+        # ORS expects (lon, lat); the destination goes first
+        locations = [[float(destination[1]), float(destination[0])]] + [
+            [float(sources[i][1]), float(sources[i][0])] for i in chunk
+        ]
+        _record_route_call("ors_matrix")
+        matrix = client.distance_matrix(
+            locations=locations,
+            profile=profile,
+            sources=list(range(1, len(locations))),
+            destinations=[0],
+            metrics=["distance"],
+        )
+        for i, row in zip(chunk, matrix["distances"]):
+            distances[i] = row[0]
+            if row[0] is not None:
+                route_cache.set(keys[i], row[0])
+    return distances
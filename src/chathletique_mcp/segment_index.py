@@ -0,0 +1,179 @@
+"""Persistent geohash-keyed index of Strava ``explore_segments`` results.
+
+Segments are stored once, decoded, with the geohash of their start, and the
+explored bounds are recorded. Bounds lying inside an explored area are served
+locally, even when they differ from the bounds explored: the segments starting
+in them are found by geohash prefix over the cells covering the bounds.
+``create_itinerary`` asks for four quadrants per request; the quadrants not
+covered yet are fetched concurrently and the results are deduplicated by
+segment id.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections.abc import Callable
+
+from .concurrency import fan_out
+from .geo import geohash_cover, geohash_encode
+from .rate_limit import RateLimitError
+from .storage import LazyDatabase, transaction
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS segments (
+    id INTEGER PRIMARY KEY,
+    name TEXT,
+    distance_m REAL,
+    points TEXT,
+    start_lat REAL,
+    start_lon REAL,
+    end_lat REAL,
+    end_lon REAL,
+    geohash TEXT
+);
+CREATE INDEX IF NOT EXISTS segments_by_geohash ON segments (geohash);
+CREATE TABLE IF NOT EXISTS explored (
+    tile TEXT PRIMARY KEY,
+    min_lat REAL NOT NULL,
+    min_lon REAL NOT NULL,
+    max_lat REAL NOT NULL,
+    max_lon REAL NOT NULL,
+    fetched_at REAL NOT NULL
+);
+"""
+
+
+def tile_key(bounds: list[float], precision: int = 6) -> str:
+    """Key of an explored bounds ``[min_lat, min_lon, max_lat, max_lon]``."""
+    min_lat, min_lon, max_lat, max_lon = bounds
+    center = geohash_encode((min_lat + max_lat) / 2, (min_lon + max_lon) / 2, precision)
+    return f"{center}/{max_lat - min_lat:.3f}x{max_lon - min_lon:.3f}"
+
+
+class SegmentIndex:
+    """SQLite index of explored segments.
+
+    Args:
+        path: SQLite file, defaults to ``segments.sqlite3`` in the data dir.
+        ttl: Seconds before a tile is explored again (``SEGMENT_INDEX_TTL``,
+            default 30 days).
+    """
+
+    def __init__(self, path: str | os.PathLike | None = None, ttl: float | None = None):
+        self._db = LazyDatabase(path, "segments.sqlite3", SCHEMA)
+        self.ttl = (
+            ttl
+            if ttl is not None
+            else float(os.getenv("SEGMENT_INDEX_TTL", str(30 * 24 * 3600)))
+        )
+        self._lock = threading.Lock()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        return self._db.connection()
+
+    def lookup(self, bounds: list[float]) -> list[dict] | None:
+        """Return the segments starting in the bounds, or None if not explored.
+
+        The bounds are explored when they lie inside bounds explored less than
+        ``ttl`` seconds ago.
+        """
+        min_lat, min_lon, max_lat, max_lon = bounds
+        with self._lock:
+            covered = self.conn.execute(
+                "SELECT 1 FROM explored WHERE min_lat <= ? AND min_lon <= ? "
+                "AND max_lat >= ? AND max_lon >= ? AND fetched_at >= ?",
+                (min_lat, min_lon, max_lat, max_lon, time.time() - self.ttl),
+            ).fetchone()
+            if not covered:
+                return None
+            rows = []
+            for cell in geohash_cover(bounds):
+                # Prefix match as a range, so that the geohash index is used
+                rows += self.conn.execute(
+                    "SELECT id, name, distance_m, points, start_lat, start_lon, "
+                    "end_lat, end_lon FROM segments "
+                    "WHERE geohash >= ? AND geohash < ? "
+                    "AND start_lat BETWEEN ? AND ? AND start_lon BETWEEN ? AND ?",
+                    (cell, cell + "~", min_lat, max_lat, min_lon, max_lon),
+                ).fetchall()
+        return [
+            {
+                "id": seg_id,
+                "name": name,
+                "distance_m": distance_m,
+                "points": [tuple(p) for p in json.loads(points)],
+                "start_latlng": tuple(latlngs[:2]),
+                "end_latlng": tuple(latlngs[2:]),
+            }
+            for seg_id, name, distance_m, points, *latlngs in sorted(rows)
+        ]
+
+    def store(self, bounds: list[float], segments: list[dict]) -> None:
+        """Store the segments returned by Strava for the bounds."""
+        rows = [
+            (
+                seg["id"],
+                seg["name"],
+                seg["distance_m"],
+                json.dumps(seg["points"]),
+                *seg["start_latlng"],
+                *seg["end_latlng"],
+                geohash_encode(*seg["start_latlng"]),
+            )
+            for seg in segments
+        ]
+        with self._lock, transaction(self.conn):
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO segments VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO explored VALUES (?, ?, ?, ?, ?, ?)",
+                (tile_key(bounds), *bounds, time.time()),
+            )
+
+    def segments_for(
+        self,
+        bounds_list: list[list[float]],
+        fetch: Callable[[list[float]], list[dict]],
+    ) -> list[list[dict]]:
+        """Return the segments of each bounds, fetching only the missing tiles.
+
+        Missing tiles are fetched concurrently with ``fetch``. A segment found in
+        several bounds is only kept in the first one; a tile that fails to load
+        is left empty.
+
+        Returns:
+            list[list[dict]]: One list of segments per bounds, in order.
+
+        Raises:
+            RateLimitError: The Strava budget is spent, tells when to retry.
+            Exception: The error of a tile, if none of them loaded.
+        """
+        found = [self.lookup(bounds) for bounds in bounds_list]
+        missing = [i for i, segments in enumerate(found) if segments is None]
+        errors = []
+        for i, segments, error in fan_out(lambda i: fetch(bounds_list[i]), missing):
+            if error is not None:
+                print(f"Error exploring segments in {bounds_list[i]}: {error}")
+                errors.append(error)
+                found[i] = []
+                continue
+            self.store(bounds_list[i], segments)
+            found[i] = segments
+        # The tiles loaded so far are stored; the caller decides when to retry
+        for error in errors:
+            if isinstance(error, RateLimitError):
+                raise error
+        if errors and len(errors) == len(missing):
+            raise errors[0]
+
+        seen: set[int] = set()
+        result = []
+        for segments in found:
+            result.append([seg for seg in segments if seg["id"] not in seen])
+            seen.update(seg["id"] for seg in segments)
+        return result
@@ -0,0 +1,80 @@
+"""Coalescing of identical concurrent async calls.
+
+While a call for a key is in flight, later calls with the same key wait for it
+and share its result (or exception) instead of repeating the work. The call
+runs in its own task, so a waiter being cancelled does not cancel the others.
+
+``coalesce`` applies this to MCP tools: concurrent calls of a tool with the same
+arguments, on behalf of the same caller, share one execution.
+"""
+
+import asyncio
+import functools
+import inspect
+import json
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any
+
+from .concurrency import run_blocking
+
+
+class SingleFlight:
+    """Registry of the in-flight calls of one event loop, by key."""
+
+    def __init__(self):
+        self._inflight: dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Await ``fn()``, or the call already in flight for ``key``."""
+        task = self._inflight.get(key)
+        if task is None or task.get_loop() is not asyncio.get_running_loop():
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # retrieved, even if every waiter was cancelled
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+
+def coalesce(identity: Callable[[], Hashable | None] | None = None):
+    """Decorator sharing one execution between identical concurrent tool calls.
+
+    Place it under ``@mcp.tool(...)``, over a coroutine function (or an
+    ``offload``-ed one). Calls are identical when they have the same tool and
+    arguments, after defaults are applied, and the same identity.
+
+    Args:
+        identity: Returns who the result belongs to, for tools answering with
+            the caller's data; it may block and runs in the blocking
+            executor. Calls it returns None for are never coalesced. Leave
+            it out for tools whose result does not depend on the caller,
+            such as weather forecasts.
+    """
+
+    def decorator(fn: Callable[..., Awaitable[Any]]):
+        signature = inspect.signature(fn)
+        flight = SingleFlight()
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            who = None
+            if identity is not None:
+                who = await run_blocking(identity)
+                if who is None:
+                    return await fn(*args, **kwargs)  # unknown caller
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = (who, json.dumps(bound.arguments, sort_keys=True, default=str))
+            return await flight.do(key, lambda: fn(*args, **kwargs))
+
+        wrapper.singleflight = flight
+        return wrapper
+
+    return decorator
@@ -0,0 +1,214 @@
+"""Pluggable store for the state shared by the server workers.
+
+Tokens and other per-athlete state live here instead of module globals, so
+several worker processes can serve the same athletes. ``STATE_STORE`` selects
+the backend: ``memory`` (default, one process) or ``sqlite`` (a WAL database in
+the data dir shared by all the workers of the host, ``sqlite:///path/to/file``
+for another file). Values must be JSON-serializable.
+"""
+
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Callable, Iterator, MutableMapping
+from typing import Any
+
+from .storage import connect, data_dir
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS state (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    expires_at REAL,
+    PRIMARY KEY (namespace, key)
+);
+"""
+
+
+class StateStore(ABC):
+    """Interface of the state stores: JSON values by namespace and key."""
+
+    @abstractmethod
+    def get(self, namespace: str, key: str, default: Any = None) -> Any:
+        """Return the value, or ``default`` if missing or expired."""
+
+    @abstractmethod
+    def set(
+        self, namespace: str, key: str, value: Any, ttl: float | None = None
+    ) -> None:
+        """Store a value, expiring after ``ttl`` seconds if given."""
+
+    @abstractmethod
+    def delete(self, namespace: str, key: str) -> None:
+        """Remove a value, if present."""
+
+    @abstractmethod
+    def items(self, namespace: str) -> list[tuple[str, Any]]:
+        """Return the valid (key, value) pairs of a namespace."""
+
+
+class MemoryStateStore(StateStore):
+    """State kept in the memory of the process."""
+
+    def __init__(self):
+        self._data: dict[tuple[str, str], tuple[str, float | None]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, namespace, key, default=None):
+        with self._lock:
+            value, expires_at = self._data.get((namespace, key), (None, None))
+        if value is None or (expires_at is not None and expires_at <= time.time()):
+            return default
+        return json.loads(value)  # a copy, like the shared stores
+
+    def set(self, namespace, key, value, ttl=None):
+        expires_at = time.time() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[(namespace, key)] = (json.dumps(value), expires_at)
+
+    def delete(self, namespace, key):
+        with self._lock:
+            self._data.pop((namespace, key), None)
+
+    def items(self, namespace):
+        now = time.time()
+        with self._lock:
+            entries = list(self._data.items())
+        return [
+            (key, json.loads(value))
+            for (ns, key), (value, expires_at) in entries
+            if ns == namespace and (expires_at is None or expires_at > now)
+        ]
+
+
+class SQLiteStateStore(StateStore):
+    """State kept in a SQLite database shared by the processes of the host.
+
+    Args:
+        path: SQLite file, defaults to ``state.sqlite3`` in the data dir. It
+            holds access tokens, so it is only readable by its owner.
+    """
+
+    def __init__(self, path: str | os.PathLike | None = None):
+        path = path or data_dir() / "state.sqlite3"
+        self.conn = connect(path)
+        self.conn.executescript(SCHEMA)
+        os.chmod(path, 0o600)
+        self._lock = threading.Lock()
+
+    def get(self, namespace, key, default=None):
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT value FROM state WHERE namespace = ? AND key = ? "
+                "AND (expires_at IS NULL OR expires_at > ?)",
+                (namespace, key, time.time()),
+            ).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set(self, namespace, key, value, ttl=None):
+        expires_at = time.time() + ttl if ttl is not None else None
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO state VALUES (?, ?, ?, ?)",
+                (namespace, key, json.dumps(value), expires_at),
+            )
+
+    def delete(self, namespace, key):
+        with self._lock:
+            self.conn.execute(
+                "DELETE FROM state WHERE namespace = ? AND key = ?", (namespace, key)
+            )
+
+    def items(self, namespace):
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT key, value FROM state WHERE namespace = ? "
+                "AND (expires_at IS NULL OR expires_at > ?)",
+                (namespace, time.time()),
+            ).fetchall()
+        return [(key, json.loads(value)) for key, value in rows]
+
+
+_MISSING = object()
+
+
+class StoreMapping(MutableMapping):
+    """Dict view of a namespace of the state store of the process.
+
+    Lets code written against a plain dict keep its state in the shared
+    store instead, e.g. for state every worker must see.
+
+    Args:
+        namespace: Namespace of the entries.
+        dump: Converts a value to JSON-serializable data, identity by default.
+        load: Converts stored data back to a value, identity by default.
+        ttl: Seconds the entries are kept, forever if None.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        dump: Callable[[Any], Any] | None = None,
+        load: Callable[[Any], Any] | None = None,
+        ttl: float | None = None,
+    ):
+        self.namespace = namespace
+        self.dump = dump or (lambda value: value)
+        self.load = load or (lambda data: data)
+        self.ttl = ttl
+
+    def __getitem__(self, key: str) -> Any:
+        data = get_state_store().get(self.namespace, key, _MISSING)
+        if data is _MISSING:
+            raise KeyError(key)
+        return self.load(data)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        get_state_store().set(self.namespace, key, self.dump(value), ttl=self.ttl)
+
+    def __delitem__(self, key: str) -> None:
+        if key not in self:
+            raise KeyError(key)
+        get_state_store().delete(self.namespace, key)
+
+    def __contains__(self, key) -> bool:
+        return get_state_store().get(self.namespace, key, _MISSING) is not _MISSING
+
+    def __iter__(self) -> Iterator[str]:
+        return iter([key for key, _ in get_state_store().items(self.namespace)])
+
+    def __len__(self) -> int:
+        return len(get_state_store().items(self.namespace))
+
+
+def create_state_store(url: str | None = None) -> StateStore:
+    """Create the store described by ``url`` (defaults to ``STATE_STORE``).
+
+    Raises:
+        ValueError: Unknown backend.
+    """
+    url = url or os.getenv("STATE_STORE", "memory")
+    if url == "memory":
+        return MemoryStateStore()
+    if url == "sqlite":
+        return SQLiteStateStore()
+    if url.startswith("sqlite:///"):
+        return SQLiteStateStore(url.removeprefix("sqlite:///"))
+    raise ValueError(f"Unknown STATE_STORE: {url}")
+
+
+_state_store: StateStore | None = None
+_state_store_lock = threading.Lock()
+
+
+def get_state_store() -> StateStore:
+    """Return the store of the process, created on first use."""
+    global _state_store  # noqa
+    if _state_store is None:
+        with _state_store_lock:
+            if _state_store is None:
+                _state_store = create_state_store()
+    return _state_store
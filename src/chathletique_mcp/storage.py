@@ -0,0 +1,84 @@
+"""Local on-disk storage helpers shared by the caches and stores of the server."""
+
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+
+def data_dir() -> Path:
+    """Return the directory holding the server's local data, creating it if needed.
+
+    The location can be overridden with the ``CHATHLETIQUE_DATA_DIR`` environment
+    variable; it defaults to ``~/.cache/chathletique-mcp``.
+    """
+    path = Path(
+        os.getenv("CHATHLETIQUE_DATA_DIR")
+        or Path.home() / ".cache" / "chathletique-mcp"
+    )
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def connect(path: str | os.PathLike) -> sqlite3.Connection:
+    """Open a SQLite database that can be shared between threads and processes.
+
+    Args:
+        path: Database file, or ``":memory:"`` for a throwaway database.
+
+    Returns:
+        sqlite3.Connection: Connection in autocommit mode with WAL journaling.
+    """
+    conn = sqlite3.connect(
+        path, check_same_thread=False, isolation_level=None, timeout=30
+    )
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class LazyDatabase:
+    """SQLite database of a store, opened with its schema on first use.
+
+    The stores are module-level singletons: opening their file lazily keeps
+    importing the server free of file system side effects.
+
+    Args:
+        path: Database file, None for ``filename`` in the data dir.
+        filename: Default file name.
+        schema: Script creating the tables, run when the database is opened.
+    """
+
+    def __init__(self, path: str | os.PathLike | None, filename: str, schema: str):
+        self.path = path
+        self.filename = filename
+        self.schema = schema
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    def connection(self) -> sqlite3.Connection:
+        """Return the connection, opening the database if needed."""
+        if self._conn is None:
+            with self._lock:
+                if self._conn is None:
+                    conn = connect(self.path or data_dir() / self.filename)
+                    conn.executescript(self.schema)
+                    self._conn = conn
+        return self._conn
+
+
+@contextmanager
+def transaction(conn: sqlite3.Connection):
+    """Run the block in one transaction of an autocommit connection.
+
+    The transaction is rolled back if the block raises, so the connection is
+    never left inside an open transaction.
+    """
+    conn.execute("BEGIN")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
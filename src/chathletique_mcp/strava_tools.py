@@ -4,39 +4,57 @@ import json
 import math
 import os
 import random
-import ssl
+import threading
 from urllib.parse import quote_plus, urlencode
 
-import certifi
 import numpy as np
-import openrouteservice
 import polyline
-import requests
-import stravalib
-from dotenv import load_dotenv
-from geopy.exc import GeocoderServiceError, GeocoderTimedOut
-from geopy.geocoders import Nominatim
 from pydantic import BaseModel, Field
 
-from .mcp_utils import get_current_token, mcp
+from .activity_store import ActivityStore
+from .client_pool import StravaClientPool
+from .concurrency import fan_out, offload
+from .elevation import get_elevation
+from .geo import bearing_deg, haversine_m, offset_point, rank_candidate_paths
+from .geocoding import geocoder
+from .loop_library import (
+    LOOP_LIBRARY_PLACES,
+    LoopLibrary,
+    loop_key,
+    loop_path,
+    rank_loops,
+)
+from .mcp_utils import current_token_identity, get_current_token, mcp
+from .routing import compute_route, count_route_calls, distances_to, get_ors_client
+from .segment_index import SegmentIndex
+from .singleflight import coalesce
+from .stream_cache import StreamCache
 
 # -------------------------------- Globals --------------------------------
-load_dotenv()
-
-ors_api_key = os.getenv("ORS_KEY")
-client_ors = openrouteservice.Client(key=ors_api_key)
-google_api_key = os.getenv("GOOGLE_MAPS_API_KEY")
-ROUTES_URL = (
-    "https://routes.googleapis.com/directions/v2:computeRoutes"  # Google Map URL
+client_pool = StravaClientPool()  # rate-limited, keep-alive Strava clients
+activity_store = ActivityStore()  # local copy of the athletes' activities
+stream_cache = StreamCache()  # memory-mapped activity streams
+segment_index = SegmentIndex()  # explored segments by geohash tile
+loop_library = LoopLibrary()  # validated loops by start cell and distance
+STREAM_TYPES = ["time", "distance", "velocity_smooth", "heartrate"]
+ITINERARY_SEARCH_WORKERS = int(os.getenv("ITINERARY_SEARCH_WORKERS", "4"))
+ITINERARY_MAX_ROUTE_CALLS = int(os.getenv("ITINERARY_MAX_ROUTE_CALLS", "6"))
+ITINERARY_MAX_ALTERNATIVES = int(os.getenv("ITINERARY_MAX_ALTERNATIVES", "5"))
+# Candidate loops searched per loop returned when several alternatives are
+# asked, the best ones are kept; a single loop stops at the first that fits
+ITINERARY_OVERSAMPLE = int(os.getenv("ITINERARY_OVERSAMPLE", "3"))
+# Service token of the loop library job, which runs outside any user request
+LOOP_LIBRARY_STRAVA_TOKEN = os.getenv("LOOP_LIBRARY_STRAVA_TOKEN") or os.getenv(
+    "STRAVA_ACCESS_TOKEN"
 )
 
 
-def get_strava_client():
-    """Get authenticated Strava client."""
-    token = get_current_token()
+def get_strava_client(token: str | None = None):
+    """Get authenticated Strava client, of the current user unless ``token``."""
+    token = token or get_current_token()
     if not token:
         raise Exception("No Strava access token available. Please authenticate first.")
-    return stravalib.Client(access_token=token)
+    return client_pool.get(token)  # reuses the client and its open connections
 
 
 class Coordinates(BaseModel):
@@ -52,12 +70,16 @@ class Coordinates(BaseModel):
 
 
 # -------------------------------- Tools --------------------------------
+# stravalib, geopy and openrouteservice are blocking: the tools run in the
+# bounded executor of ``offload`` instead of on the event loop
 
 
 @mcp.tool(
     title="Get Authenticated user Strava Stats",
     description="Return the Strava stats of the user as a JSON File ",
 )
+@coalesce(identity=current_token_identity)
+@offload
 def get_user_stats() -> str:
     """Get current user's Strava statistics.
 
@@ -66,8 +88,9 @@ def get_user_stats() -> str:
             activity count, and performance metrics.
     """
     client_strava = get_strava_client()
-    athlete_id = client_strava.get_athlete().id  # APi call
-    ahtlete_stats = client_strava.get_athlete_stats(athlete_id)
+    athlete_id = activity_store.athlete_id(client_strava)
+    activity_store.sync(client_strava, athlete_id)  # only fetches the delta
+    ahtlete_stats = activity_store.athlete_stats(athlete_id)
     dict = {
         "recent_run_totals": ahtlete_stats.recent_run_totals.model_dump_json(),
         "ytd_run_totals": ahtlete_stats.ytd_run_totals.model_dump_json(),
@@ -81,6 +104,7 @@ def get_user_stats() -> str:
     title="Get Last Runs",
     description="Get the last runs from the user's Strava account and return them in a list for activity analysis",
 )
+@offload
 def get_last_runs() -> str:
     """Get the last runs from the user's Strava account and return them in a list for activity analysis
     This function will use the Strava API to get the last runs from the user's Strava account and return them in a list for activity analysis
@@ -90,9 +114,11 @@ def get_last_runs() -> str:
     """
     text_result: str = ""
 
-    # Get the last 10 runs
+    # Get the last runs from the local activity store, synced with Strava
     client_strava = get_strava_client()
-    activities = client_strava.get_activities(limit=2)
+    athlete_id = activity_store.athlete_id(client_strava)
+    activity_store.sync(client_strava, athlete_id)
+    activities = activity_store.recent_activities(athlete_id, limit=2)
 
     # Extract the data from the activities
     for activity in activities:
@@ -118,53 +144,44 @@ def get_last_runs() -> str:
     return text_result
 
 
-@mcp.tool(
-    title="Create Itinerary",
-    description="Create an itinerary for the user",
-)
-def create_itinerary(
-    starting_place: str = Field(
-        description="The start of the itinerary", default="Opéra, Paris"
-    ),
-    distance_km: int = Field(
-        description="The distance of the itinerary in km", default=10
-    ),
-) -> str:
-    """Produces an itinerary for the user
+def loop_climb(loop: dict) -> float | None:
+    """Elevation gain in meters of a loop, None without elevation tiles."""
+    elevation = get_elevation()
+    if elevation is None:
+        return None
+    gain, _ = elevation.climb(loop_path(loop))
+    return round(gain)
+
+
+def plan_loops(
+    start_coords: tuple[float, float],
+    distance_m: int,
+    k: int = 1,
+    max_climb_m: float | None = None,
+    token: str | None = None,
+) -> list[dict]:
+    """Compute up to ``k`` running loops of about ``distance_m`` meters.
+
+    Each loop goes through a different segment. The segments, the distance
+    matrix and the routes are fetched once for all the loops. A single loop is
+    the first one found within the tolerance; for alternatives, up to
+    ``k * ITINERARY_OVERSAMPLE`` distinct candidate loops are searched and the
+    ``k`` best are picked with ``rank_loops``. With elevation tiles, loops
+    climbing more than ``max_climb_m`` are rejected.
 
     Args :
-    - start : tuple[float, float]
-    - distance_km : int
+    - start_coords : tuple[float, float]
+    - distance_m : int
+    - k : int
+    - max_climb_m : float | None
+    - token : str | None, Strava token exploring the segments, the one of the
+      current user by default
 
     Returns :
-    - gmaps_directions_link : str
+    - loops : list of dict with the ``start``, ``waypoints``, ``distance_m`` and
+      ``polyline`` of each loop, empty if no segment of the area fits the distance
     """
 
-    def get_coordinates(place_name: str) -> tuple[float, float]:
-        geolocator = Nominatim(
-            user_agent="chathletique-mcp/0.1",
-            timeout=10,
-            ssl_context=ssl.create_default_context(cafile=certifi.where()),
-        )
-        try:
-            loc = geolocator.geocode(place_name, language="fr")
-            if loc:
-                return float(loc.latitude), float(loc.longitude)
-        except (GeocoderTimedOut, GeocoderServiceError):
-            pass
-
-        url = "https://nominatim.openstreetmap.org/search"
-        headers = {"User-Agent": "chathletique-mcp/0.1 (contact: you@example.com)"}
-        params = {"q": place_name, "format": "json", "limit": 1}
-        r = requests.get(
-            url, headers=headers, params=params, timeout=10, verify=certifi.where()
-        )
-        r.raise_for_status()
-        data = r.json()
-        if not data:
-            raise ValueError(f"Lieu introuvable: {place_name}")
-        return float(data[0]["lat"]), float(data[0]["lon"])
-
     def bounds_for_run(center_lat, center_lon, distance_m: int):
         """
         Return 4 bounds (SW, SE, NW, NE) :
@@ -189,49 +206,8 @@ def create_itinerary(
         ]
         return bounds
 
-    def compute_route(
-        origin, destination, waypoints=None, mode="WALK", api_key=google_api_key
-    ) -> dict:
-        """
-        origin, destination, waypoints: (lat, lon)
-        mode: "WALK" | "DRIVE" | "BICYCLE" | "TWO_WHEELER"
-        Retourne dict avec distance (m), durée ISO, et polyline encodée.
-        """
-        headers = {
-            "Content-Type": "application/json",
-            "X-Goog-Api-Key": api_key,
-            "X-Goog-FieldMask": "routes.distanceMeters,routes.duration,routes.polyline.encodedPolyline",
-        }
-
-        def ll(pt):  # (lat, lon) -> payload Routes API
-            return {
-                "location": {
-                    "latLng": {"latitude": float(pt[0]), "longitude": float(pt[1])}
-                }
-            }
-
-        body = {
-            "origin": ll(origin),
-            "destination": ll(destination),
-            "travelMode": mode.upper(),
-        }
-        if waypoints:
-            body["intermediates"] = [ll(w) for w in waypoints]
-
-        r = requests.post(ROUTES_URL, headers=headers, json=body, timeout=20)
-        if r.status_code != 200:
-            raise RuntimeError(f"Routes API {r.status_code}: {r.text}")
-
-        route = r.json()["routes"][0]
-
-        return {
-            "distance_m": route["distanceMeters"],
-            "duration_iso": route["duration"],
-            "encoded_polyline": route["polyline"]["encodedPolyline"],
-        }
-
     def get_segments(bounds):
-        client_strava = get_strava_client()
+        client_strava = get_strava_client(token)
 
         segments = client_strava.explore_segments(
             bounds=bounds, activity_type="running"
@@ -245,8 +221,8 @@ def create_itinerary(
                 "name": seg.name,
                 "distance_m": float(seg.distance),
                 "points": polyline.decode(seg.points),
-                "start_latlng": seg.start_latlng,
-                "end_latlng": seg.end_latlng,
+                "start_latlng": tuple(seg.start_latlng.root),
+                "end_latlng": tuple(seg.end_latlng.root),
             }
             list_segment.append(desc)
 
@@ -260,11 +236,212 @@ def create_itinerary(
         middle_coord_index2 = 3 * length_segment // 4
         quarter_coord = segment["points"][middle_coord_index1]
         three_quarter_coord = segment["points"][middle_coord_index2]
-        start_coord = (segment["start_latlng"].root[0], segment["start_latlng"].root[1])
-        end_coord = (segment["end_latlng"].root[0], segment["end_latlng"].root[1])
+        start_coord = (segment["start_latlng"][0], segment["start_latlng"][1])
+        end_coord = (segment["end_latlng"][0], segment["end_latlng"][1])
 
         return [start_coord, quarter_coord, three_quarter_coord, end_coord]
 
+    def create_path(list_segment, distance, start_coords, k):
+        candidates = [seg for list_seg in list_segment for seg in list_seg]
+
+        # Discard on geometry alone the segments whose route from the start
+        # (start -> quarter -> three quarters -> segment start) cannot fall in
+        # the window, and route the most plausible ones first
+        coords = [get_path_segment(seg) for seg in candidates]
+        paths = [[start_coords, *coord[1:-1], coord[0]] for coord in coords]
+        ranked = rank_candidate_paths(paths, distance / 3, distance / 2)
+
+        new_list_segment = None
+        if get_ors_client() is not None and len(ranked):
+            # One matrix round trip for every segment: reaching the segment
+            # start from the start, plus running the segment
+            try:
+                road = distances_to([coords[i][0] for i in ranked], start_coords)
+                new_list_segment = [
+                    candidates[i]
+                    for i, d in zip(ranked, road)
+                    if d is not None
+                    and distance / 3 < d + candidates[i]["distance_m"] < distance / 2
+                ]
+            except Exception as e:
+                print(f"Error computing the distance matrix: {e}")
+
+        if new_list_segment is None:  # no matrix backend, one route per segment
+            new_list_segment = []
+            for i in ranked:
+                seg, coord_seg = candidates[i], coords[i]
+                if (
+                    distance / 3
+                    < compute_route(
+                        start_coords,
+                        coord_seg[0],
+                        coord_seg[1:-1],
+                        mode="WALK",
+                    )["distance_m"]
+                    < (distance) / 2
+                ):
+                    new_list_segment.append(seg)
+
+        segs = new_list_segment[:]
+        random.shuffle(
+            segs
+        )  # on choisit un ordre aléatoire pour eviter de donner le meme segment au client à chaque fois
+
+        found = threading.Event()
+
+        def fit_loop(seg):
+            path_segment = get_path_segment(seg)
+            seg_end = path_segment[-1]
+            # The extra waypoint moves beyond the end of the segment, away from
+            # the start, so that pushing it further always lengthens the loop
+            bearing = bearing_deg(*start_coords, *seg_end)
+            max_back = 0.9 * float(haversine_m(*start_coords, *seg_end))
+
+            offsets, errors = [], []
+            offset = 0.0
+            for _ in range(ITINERARY_MAX_ROUTE_CALLS):
+                if found.is_set():  # another candidate already succeeded
+                    return None
+
+                waypoint = offset_point(*seg_end, bearing, offset)
+                route = compute_route(
+                    start_coords,
+                    start_coords,
+                    [*path_segment, waypoint],
+                    mode="WALK",
+                )
+
+                if distance - 100 < route["distance_m"] < distance + 100:
+                    loop = {
+                        "start": start_coords,
+                        "waypoints": [*path_segment, waypoint],
+                        "distance_m": route["distance_m"],
+                        "polyline": route.get("encoded_polyline"),
+                    }
+                    loop["elevation_gain_m"] = loop_climb(loop)
+                    if (
+                        max_climb_m is not None
+                        and loop["elevation_gain_m"] is not None
+                        and loop["elevation_gain_m"] > max_climb_m
+                    ):
+                        return None  # this segment is too hilly
+                    return loop
+
+                # Secant step on the measured distance; an out-and-back detour
+                # adds about twice the offset when the secant is not usable
+                offsets.append(offset)
+                errors.append(route["distance_m"] - distance)
+                slope = 2.0
+                if len(offsets) > 1 and offsets[-1] != offsets[-2]:
+                    secant = (errors[-1] - errors[-2]) / (offsets[-1] - offsets[-2])
+                    if secant > 0.5:
+                        slope = secant
+                offset = min(max(offset - errors[-1] / slope, -max_back), distance / 2)
+
+            return None
+
+        # Several candidates are searched at once; once enough distinct loops
+        # are within the tolerance the remaining searches are cancelled, and
+        # the best k of them are kept (oversampled only for alternatives)
+        wanted = k if k == 1 else k * ITINERARY_OVERSAMPLE
+        loops = {}
+        for seg, loop, error in fan_out(
+            fit_loop, segs, max_workers=ITINERARY_SEARCH_WORKERS
+        ):
+            if error is not None:
+                print(f"Error fitting a loop on segment {seg['name']}: {error}")
+                continue
+            if loop is not None:
+                loops.setdefault(loop_key(loop), loop)
+                if len(loops) >= wanted:
+                    found.set()
+                    break
+
+        return rank_loops(list(loops.values()), distance, k, max_climb_m=max_climb_m)
+
+    bounds = bounds_for_run(start_coords[0], start_coords[1], distance_m)
+    # Quadrants already explored are served from the local segment index
+    list_segment = segment_index.segments_for(bounds, get_segments)
+    with count_route_calls() as route_calls:
+        loops = create_path(list_segment, distance_m, start_coords, k)
+    print(
+        f"{len(loops)} loops of {distance_m} m from {start_coords}: "
+        f"{route_calls.total} upstream routing requests {dict(route_calls.calls)}"
+    )
+    return loops
+
+
+def plan_loop(
+    start_coords: tuple[float, float], distance_m: int, token: str | None = None
+) -> dict | None:
+    """Compute one loop with ``plan_loops``, None if none fits the distance."""
+    loops = plan_loops(start_coords, distance_m, token=token)
+    return loops[0] if loops else None
+
+
+def start_loop_library_refresh():
+    """Start the background job stocking the loop library of popular places.
+
+    The job plans with the service token ``LOOP_LIBRARY_STRAVA_TOKEN`` (default
+    ``STRAVA_ACCESS_TOKEN``), so that the shared library does not depend on
+    the athlete who authenticated last. Without one the job is not started.
+    """
+    token = LOOP_LIBRARY_STRAVA_TOKEN
+    if not token:
+        if LOOP_LIBRARY_PLACES:
+            print("Loop library refresh disabled: LOOP_LIBRARY_STRAVA_TOKEN not set")
+        return None
+    return loop_library.start_refresh(
+        build=lambda start, distance_m: plan_loop(start, distance_m, token=token),
+        geocode=lambda place: geocoder.geocode(place, language="fr"),
+    )
+
+
+@mcp.tool(
+    title="Create Itinerary",
+    description="Create an itinerary for the user",
+)
+@coalesce(identity=current_token_identity)
+@offload
+def create_itinerary(
+    starting_place: str = Field(
+        description="The start of the itinerary", default="Opéra, Paris"
+    ),
+    distance_km: int = Field(
+        description="The distance of the itinerary in km", default=10
+    ),
+    alternatives: int = Field(
+        description="The number of alternative itineraries to return, best first",
+        default=1,
+        ge=1,
+        le=ITINERARY_MAX_ALTERNATIVES,
+    ),
+    max_climb_m: int | None = Field(
+        description="The maximum elevation gain of the itinerary in meters",
+        default=None,
+        ge=0,
+    ),
+) -> str:
+    """Produces an itinerary for the user
+
+    Args :
+    - start : tuple[float, float]
+    - distance_km : int
+    - alternatives : int
+    - max_climb_m : int | None
+
+    Returns :
+    - gmaps_directions_link : str, or with several alternatives a JSON list of
+      the ranked itineraries with their link, distance, elevation gain and
+      encoded polyline
+    """
+
+    def get_coordinates(place_name: str) -> tuple[float, float]:
+        coords = geocoder.geocode(place_name, language="fr")  # cached, throttled
+        if coords is None:
+            raise ValueError(f"Lieu introuvable: {place_name}")
+        return coords
+
     def _get_gmaps_directions_link(
         origin_coords: tuple[float, float],
         waypoints_coords_list: list[tuple[float, float]] | None = None,
@@ -295,81 +472,51 @@ def create_itinerary(
             params, quote_via=quote_plus
         )
 
-    def create_path(list_segment, distance, start_coords):
-        new_list_segment = []
-
-        for list_seg in list_segment:
-            for seg in list_seg:
-                coord_seg = get_path_segment(seg)
-                if (
-                    distance / 3
-                    < compute_route(
-                        start_coords,
-                        coord_seg[0],
-                        coord_seg[1:-1],
-                        mode="WALK",
-                        api_key=google_api_key,
-                    )["distance_m"]
-                    < (distance) / 2
-                ):
-                    new_list_segment.append(seg)
-
-        segs = new_list_segment[:]
-        random.shuffle(
-            segs
-        )  # on choisit un ordre aléatoire pour eviter de donner le meme segment au client à chaque fois
-
-        for seg in segs:
-            pas = 0.1
-            path_segment = get_path_segment(seg)
-            new_waypoint = (
-                path_segment[-1][0] + pas,
-                path_segment[-1][1] + pas,
-            )  # On choisit un point au nord est du segment
-            path_segment.append(new_waypoint)
-            pas = pas / 2
-
-            for _ in range(
-                10
-            ):  # On effectue une dichotomie pour trouver la bonne longueur
-                actual_distance = compute_route(
-                    start_coords,
-                    start_coords,
-                    path_segment,
-                    mode="WALK",
-                    api_key=google_api_key,
-                )["distance_m"]  # Regarde la distance totale
-
-                if distance - 100 < actual_distance < distance + 100:
-                    return start_coords, path_segment
-
-                if actual_distance > distance:
-                    new_waypoint = (new_waypoint[0] - pas, new_waypoint[1] - pas)
-
-                elif actual_distance < distance:
-                    new_waypoint = (new_waypoint[0] + pas, new_waypoint[1] + pas)
-
-                path_segment[-1] = new_waypoint
-                pas = pas / 2
-
-        return "No segment found"
-
     start_coords = get_coordinates(starting_place)
-    distance_m = int(distance_km) * 10000
-    bounds = bounds_for_run(start_coords[0], start_coords[1], distance_m)
-    list_segment = []
-    for bound in bounds:
-        list_segment.append(get_segments(bound))
-    path = create_path(list_segment, 10000, start_coords)
-    maps = _get_gmaps_directions_link(path[0], path[1])
+    distance_m = int(distance_km) * 1000
+    # Popular start areas are served from the library of validated loops;
+    # with a climbing limit, more are drawn since some will be filtered out
+    loops = loop_library.sample(
+        start_coords, distance_km, alternatives * (1 if max_climb_m is None else 4)
+    )
+    for loop in loops:
+        loop["elevation_gain_m"] = loop_climb(loop)
+    loops = rank_loops(loops, distance_m, alternatives, max_climb_m=max_climb_m)
+    if len(loops) < alternatives:
+        fresh = plan_loops(
+            start_coords, distance_m, alternatives - len(loops), max_climb_m
+        )
+        for loop in fresh:
+            loop_library.store(start_coords, distance_km, loop)
+        loops = rank_loops(
+            loops + fresh, distance_m, alternatives, max_climb_m=max_climb_m
+        )
+    if not loops:
+        return "No segment found"
 
-    return maps
+    if alternatives == 1:
+        return _get_gmaps_directions_link(loops[0]["start"], loops[0]["waypoints"])
+
+    itineraries = [
+        {
+            "rank": rank,
+            "gmaps_directions_link": _get_gmaps_directions_link(
+                loop["start"], loop["waypoints"]
+            ),
+            "distance_m": loop["distance_m"],
+            "elevation_gain_m": loop["elevation_gain_m"],
+            "encoded_polyline": loop["polyline"],
+        }
+        for rank, loop in enumerate(loops, start=1)
+    ]
+    return json.dumps(itineraries)
 
 
 @mcp.tool(
     title="Get Heart Rate and Speed Figures",
     description="Get heart rate and speed figures for the last activities of the user",
 )
+@offload
 def figures_speed_hr_by_activity(
     number_of_activity: int,
     resolution: str = "high",
@@ -384,34 +531,29 @@ def figures_speed_hr_by_activity(
     client_strava = get_strava_client()
     activities = client_strava.get_activities(limit=number_of_activity)
 
-    for act in activities:
-        try:
+    def load_streams(act):
+        def fetch_streams():
             streams = client_strava.get_activity_streams(
                 act.id,
-                types=["time", "distance", "velocity_smooth", "heartrate"],
+                types=STREAM_TYPES,
                 resolution=resolution,
                 series_type=series_type,
             )
-        except Exception as e:
-            print(f"Error processing activity {act.name}: {e}")
+            return {name: stream.data for name, stream in (streams or {}).items()}
+
+        return stream_cache.get_or_fetch(act.id, resolution, series_type, fetch_streams)
+
+    # Streams are fetched concurrently and processed as they arrive
+    for act, streams, error in fan_out(load_streams, activities):
+        if error is not None:
+            print(f"Error processing activity {act.name}: {error}")
             continue
 
-        t = np.array(streams["time"].data) if streams and "time" in streams else None
-        dist = (
-            np.array(streams["distance"].data)
-            if streams and "distance" in streams
-            else None
-        )
-        vel = (
-            np.array(streams["velocity_smooth"].data)
-            if streams and "velocity_smooth" in streams
-            else None
-        )
-        hr = (
-            np.array(streams["heartrate"].data)
-            if streams and "heartrate" in streams
-            else None
-        )
+        # Read-only memory maps straight from the stream cache, no copy
+        t = streams.get("time")
+        dist = streams.get("distance")
+        vel = streams.get("velocity_smooth")
+        hr = streams.get("heartrate")
 
         if (
             vel is None
@@ -0,0 +1,116 @@
+"""On-disk cache of Strava activity streams stored as memory-mapped NumPy arrays.
+
+Each (activity id, resolution, series_type) entry is a directory holding one
+``.npy`` file per stream type, written with compact dtypes and read back with
+``mmap_mode="r"``: repeated analyses cost no API call and no copy, and the
+pages are shared between every session and process of the server.
+"""
+
+import os
+import shutil
+import tempfile
+from collections.abc import Callable
+from pathlib import Path
+
+import numpy as np
+
+from .storage import data_dir
+
+# Compact dtypes per stream type, anything else is stored as float32
+STREAM_DTYPES = {
+    "time": np.int32,
+    "distance": np.float32,
+    "velocity_smooth": np.float32,
+    "heartrate": np.float32,
+    "cadence": np.float32,
+    "watts": np.float32,
+    "temp": np.float32,
+    "altitude": np.float32,
+    "grade_smooth": np.float32,
+}
+
+COMPLETE_MARKER = "complete"
+
+
+class StreamCache:
+    """Memory-mapped columnar cache of activity streams.
+
+    Args:
+        root: Cache directory, defaults to ``streams/`` in the data dir.
+    """
+
+    def __init__(self, root: str | os.PathLike | None = None):
+        self._root = Path(root) if root else None
+        self._created = False
+
+    @property
+    def root(self) -> Path:
+        """Cache directory, created on first use."""
+        if not self._created:
+            self._root = self._root or data_dir() / "streams"
+            self._root.mkdir(parents=True, exist_ok=True)
+            self._created = True
+        return self._root
+
+    def _entry_dir(self, activity_id: int, resolution: str, series_type: str) -> Path:
+        return self.root / f"{int(activity_id)}-{resolution}-{series_type}"
+
+    def get(
+        self, activity_id: int, resolution: str, series_type: str
+    ) -> dict[str, np.ndarray] | None:
+        """Return the cached streams as read-only memory maps, or None on a miss."""
+        entry = self._entry_dir(activity_id, resolution, series_type)
+        if not (entry / COMPLETE_MARKER).exists():
+            return None
+        return {path.stem: np.load(path, mmap_mode="r") for path in entry.glob("*.npy")}
+
+    def put(
+        self,
+        activity_id: int,
+        resolution: str,
+        series_type: str,
+        streams: dict[str, list],
+    ) -> dict[str, np.ndarray]:
+        """Store the streams of an activity and return them memory-mapped.
+
+        Args:
+            activity_id: Strava activity id.
+            resolution: Stream resolution requested from Strava.
+            series_type: Series type requested from Strava.
+            streams: Stream type -> raw data. Types absent from the activity
+                (e.g. heartrate without a HR monitor) are simply omitted, so
+                they are not requested again either.
+        """
+        entry = self._entry_dir(activity_id, resolution, series_type)
+        tmp = Path(tempfile.mkdtemp(dir=self.root, prefix=".tmp-"))
+        try:
+            for name, data in streams.items():
+                dtype = STREAM_DTYPES.get(name, np.float32)
+                array = np.asarray(
+                    [np.nan if v is None else v for v in data], dtype=np.float64
+                ).astype(dtype)
+                np.save(tmp / f"{name}.npy", array)
+            (tmp / COMPLETE_MARKER).touch()
+            if entry.exists() and not (entry / COMPLETE_MARKER).exists():
+                shutil.rmtree(entry, ignore_errors=True)  # interrupted write
+            # Publish atomically; a concurrent writer of the same entry may win
+            os.replace(tmp, entry)
+        except OSError:
+            if not (entry / COMPLETE_MARKER).exists():
+                raise
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+        return self.get(activity_id, resolution, series_type)
+
+    def get_or_fetch(
+        self,
+        activity_id: int,
+        resolution: str,
+        series_type: str,
+        fetch: Callable[[], dict[str, list]],
+    ) -> dict[str, np.ndarray]:
+        """Return the cached streams, calling ``fetch`` only on a cache miss."""
+        streams = self.get(activity_id, resolution, series_type)
+        if streams is None:
+            streams = self.put(activity_id, resolution, series_type, fetch())
+        return streams
@@ -0,0 +1,159 @@
+"""Per-athlete registry of Strava OAuth tokens with proactive refresh.
+
+Strava access tokens expire after six hours. The registry keeps the full token
+response of every athlete (access and refresh token, ``expires_at``) in the
+shared state store, keyed by athlete id. Tool calls read the token of their
+athlete lock-free from an immutable snapshot, replaced as a whole on every
+write. A background job refreshes the tokens shortly before they expire, so
+requests never wait on a re-authentication; a token found expired anyway is
+refreshed on the spot.
+"""
+
+import os
+import threading
+import time
+from collections.abc import Callable
+
+import requests
+
+from .state_store import StateStore, get_state_store
+
+STRAVA_TOKEN_URL = "https://www.strava.com/oauth/token"  # noqa: S105
+TOKENS = "tokens"
+
+
+def refresh_strava_token(token_data: dict) -> dict:
+    """Exchange the refresh token of a token response for a new one.
+
+    Raises:
+        requests.HTTPError: Strava refused the refresh token.
+    """
+    response = requests.post(
+        STRAVA_TOKEN_URL,
+        data={
+            "client_id": os.getenv("STRAVA_CLIENT_ID"),
+            "client_secret": os.getenv("STRAVA_CLIENT_SECRET"),
+            "grant_type": "refresh_token",
+            "refresh_token": token_data["refresh_token"],
+        },
+        timeout=10,
+    )
+    response.raise_for_status()
+    return {**token_data, **response.json()}  # keeps the athlete summary
+
+
+class TokenRegistry:
+    """Strava tokens by athlete id.
+
+    Args:
+        store: State store holding the tokens, the process one by default.
+        refresh: Exchanges a token response for a fresh one.
+        margin: Seconds before expiry a token is refreshed by the background
+            job (``STRAVA_TOKEN_REFRESH_MARGIN``, default 600).
+        clock: Wall-clock time source, for tests.
+    """
+
+    def __init__(
+        self,
+        store: StateStore | None = None,
+        refresh: Callable[[dict], dict] | None = None,
+        margin: float | None = None,
+        clock=None,
+    ):
+        self._store = store
+        self.refresh = refresh or refresh_strava_token
+        self.margin = (
+            margin
+            if margin is not None
+            else float(os.getenv("STRAVA_TOKEN_REFRESH_MARGIN", "600"))
+        )
+        self.clock = clock or time.time
+        self._tokens: dict[str, dict] = {}  # copy-on-write snapshot
+        self._write_lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    @property
+    def store(self) -> StateStore:
+        return self._store or get_state_store()
+
+    def put(self, athlete_id, token_data: dict) -> None:
+        """Store the token response of an athlete."""
+        key = str(athlete_id)
+        self.store.set(TOKENS, key, token_data)
+        self._publish(key, token_data)
+
+    def get(self, athlete_id) -> str | None:
+        """Return a valid access token of the athlete, None if unknown.
+
+        Tokens written by other workers are picked up from the shared store.
+        """
+        key = str(athlete_id)
+        token_data = self._tokens.get(key)
+        if token_data is None or self._expires(token_data):
+            token_data = self.store.get(TOKENS, key)
+            if token_data is None:
+                return None
+            if self._expires(token_data):
+                token_data = self._refresh(key, token_data)
+                if token_data is None:
+                    return None
+            self._publish(key, token_data)
+        return token_data["access_token"]
+
+    def refresh_due(self) -> int:
+        """Refresh the tokens expiring within the margin.
+
+        Returns:
+            int: Number of tokens refreshed.
+        """
+        return sum(
+            self._refresh(key, token_data, self.margin) is not None
+            for key, token_data in self.store.items(TOKENS)
+            if self._expires(token_data, self.margin)
+        )
+
+    def start_refresh(self, interval: float = 60.0) -> threading.Thread:
+        """Run ``refresh_due`` every ``interval`` seconds in a daemon thread."""
+
+        def run():
+            while True:
+                try:
+                    self.refresh_due()
+                except Exception as e:
+                    print(f"Error refreshing the Strava tokens: {e}")
+                time.sleep(interval)
+
+        thread = threading.Thread(target=run, name="token-refresh", daemon=True)
+        thread.start()
+        return thread
+
+    def _expires(self, token_data: dict, margin: float = 0.0) -> bool:
+        expires_at = token_data.get("expires_at")
+        return expires_at is not None and expires_at - margin <= self.clock()
+
+    def _refresh(self, key: str, token_data: dict, margin: float = 0.0) -> dict | None:
+        with self._refresh_lock:
+            # Another thread or worker may have refreshed it meanwhile
+            current = self.store.get(TOKENS, key) or token_data
+            if not self._expires(current, margin):
+                self._publish(key, current)
+                return current
+            if not current.get("refresh_token"):
+                return None
+            try:
+                fresh = self.refresh(current)
+            except Exception as e:
+                print(f"Error refreshing the Strava token of athlete {key}: {e}")
+                return None
+            self.store.set(TOKENS, key, fresh)
+            self._publish(key, fresh)
+            return fresh
+
+    def _publish(self, key: str, token_data: dict) -> None:
+        with self._write_lock:
+            tokens = dict(self._tokens)
+            tokens[key] = token_data
+            self._tokens = tokens
+
+
+token_registry = TokenRegistry()
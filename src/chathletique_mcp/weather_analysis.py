@@ -0,0 +1,180 @@
+"""Vectorized scoring of the forecast slots for running.
+
+The filtered forecast (``filter_weather_data`` output) is turned into NumPy
+columns, every 3-hour slot is scored with a ``ComfortModel`` in one pass, and
+only the best daylight slots plus a compact summary are handed to the model
+instead of the 40 raw entries.
+"""
+
+from dataclasses import dataclass
+from datetime import UTC, datetime
+
+import numpy as np
+
+KELVIN = 273.15
+DAY = 24 * 3600
+
+
+@dataclass
+class ComfortModel:
+    """Running comfort of a forecast slot, scored from 0 (awful) to 100 (ideal).
+
+    Each attribute below its limit costs nothing; the penalties add up and the
+    score is ``100 * exp(-penalty)``.
+
+    Attributes:
+        ideal_temp_c: Ideal felt temperature in °C.
+        temp_tolerance_c: Felt temperature gap costing a penalty of 1.
+        humidity_limit: Relative humidity (%) above which humidity costs.
+        wind_limit_ms: Wind speed (m/s) costing a penalty of 1.
+        pop_weight: Penalty of a certain chance of precipitation.
+        rain_weight: Penalty of 1 mm of rain over the slot.
+    """
+
+    ideal_temp_c: float = 12.0
+    temp_tolerance_c: float = 8.0
+    humidity_limit: float = 70.0
+    wind_limit_ms: float = 8.0
+    pop_weight: float = 1.0
+    rain_weight: float = 0.5
+
+    def score(self, columns: dict[str, np.ndarray]) -> np.ndarray:
+        """Score every slot of ``forecast_columns`` output."""
+        temp = (columns["feels_like"] - self.ideal_temp_c) / self.temp_tolerance_c
+        humidity = np.clip(columns["humidity"] - self.humidity_limit, 0, None) / (
+            100.0 - self.humidity_limit
+        )
+        wind = np.fmax(columns["wind"], columns["gust"] / 1.5) / self.wind_limit_ms
+        penalty = (
+            np.nan_to_num(temp**2)
+            + np.nan_to_num(humidity)
+            + np.nan_to_num(wind**2)
+            + self.pop_weight * np.nan_to_num(columns["pop"])
+            + self.rain_weight * np.nan_to_num(columns["rain"])
+        )
+        return 100.0 * np.exp(-penalty)
+
+
+def forecast_columns(forecast: list[dict], units: str = "standard") -> dict:
+    """Convert the filtered forecast to one NumPy column per field.
+
+    Args:
+        forecast: ``filter_weather_data`` output, city header first.
+        units: OpenWeatherMap units of the forecast; temperatures are converted
+            to °C from ``standard`` (Kelvin) and ``imperial`` (Fahrenheit).
+
+    Returns:
+        dict: ``dt`` (int64, UTC epoch) and float64 ``temp``, ``feels_like``,
+            ``humidity``, ``wind``, ``gust``, ``pop`` and ``rain`` columns,
+            NaN where a value is missing.
+    """
+    slots = forecast[1:]
+
+    def column(get):
+        return np.array(
+            [np.nan if (v := get(slot)) is None else v for slot in slots],
+            dtype=np.float64,
+        )
+
+    columns = {
+        "dt": np.array([slot.get("dt") or 0 for slot in slots], dtype=np.int64),
+        "temp": column(lambda s: s.get("temp")),
+        "feels_like": column(lambda s: s.get("feels_like")),
+        "humidity": column(lambda s: s.get("humidity")),
+        "wind": column(lambda s: (s.get("wind") or {}).get("speed")),
+        "gust": column(lambda s: (s.get("wind") or {}).get("gust")),
+        "pop": column(lambda s: s.get("pop")),
+        "rain": column(lambda s: s.get("rain")),
+    }
+    for name in ("temp", "feels_like"):
+        if units == "standard":
+            columns[name] -= KELVIN
+        elif units == "imperial":
+            columns[name] = (columns[name] - 32.0) * 5.0 / 9.0
+    return columns
+
+
+def _value(x, digits: int) -> float | None:
+    """JSON-friendly rounded value, None for NaN."""
+    return None if np.isnan(x) else round(float(x), digits)
+
+
+def _extreme(reduce, column: np.ndarray, digits: int) -> float | None:
+    """Rounded ``np.nanmin``/``np.nanmax`` of a column, None without values."""
+    return _value(reduce(column), digits) if (~np.isnan(column)).any() else None
+
+
+def daylight_mask(dt: np.ndarray, sunrise: int | None, sunset: int | None):
+    """True for the slots between sunrise and sunset.
+
+    The forecast only gives today's sunrise and sunset, so the same times of
+    day are used for the following days.
+    """
+    if not sunrise or not sunset:
+        return np.ones(dt.shape, dtype=bool)
+    return (dt - sunrise) % DAY <= (sunset - sunrise) % DAY
+
+
+def best_windows(
+    forecast: list[dict],
+    model: ComfortModel | None = None,
+    top: int = 3,
+    units: str = "standard",
+) -> dict:
+    """Return the best daylight running slots and a summary of the forecast.
+
+    Args:
+        forecast: ``filter_weather_data`` output, city header first.
+        model: Comfort model, the default one if None.
+        top: Number of slots to return.
+        units: OpenWeatherMap units of the forecast.
+
+    Returns:
+        dict: ``place``, the ``best_windows`` (local start time, score and
+            conditions, best first) and a ``summary`` of the whole forecast.
+    """
+    header = forecast[0] if forecast else {}
+    timezone = header.get("timezone") or 0
+    columns = forecast_columns(forecast, units)
+    scores = (model or ComfortModel()).score(columns)
+    daylight = daylight_mask(columns["dt"], header.get("sunrise"), header.get("sunset"))
+
+    candidates = np.flatnonzero(daylight)
+    order = candidates[np.argsort(-scores[candidates], kind="stable")][:top]
+
+    def local_time(dt):
+        return datetime.fromtimestamp(int(dt) + timezone, UTC).strftime(
+            "%Y-%m-%d %H:%M"
+        )
+
+    windows = [
+        {
+            "start": local_time(columns["dt"][i]),
+            "score": round(float(scores[i])),
+            "feels_like_c": _value(columns["feels_like"][i], 1),
+            "wind_ms": _value(columns["wind"][i], 1),
+            "pop": _value(columns["pop"][i], 2),
+            "rain_mm": _value(columns["rain"][i], 1),
+            "weather": (forecast[i + 1].get("weather") or {}).get("description"),
+        }
+        for i in order
+    ]
+
+    summary = {"slots": len(scores), "daylight_slots": int(daylight.sum())}
+    if len(scores):
+        summary.update(
+            {
+                "from": local_time(columns["dt"][0]),
+                "to": local_time(columns["dt"][-1]),
+                "temp_c": [
+                    _extreme(np.nanmin, columns["temp"], 1),
+                    _extreme(np.nanmax, columns["temp"], 1),
+                ],
+                "rainy_slots": int(
+                    ((columns["rain"] > 0) | (columns["pop"] >= 0.5)).sum()
+                ),
+                "max_wind_ms": _extreme(np.nanmax, columns["wind"], 1),
+                "mean_score": round(float(scores.mean())),
+            }
+        )
+    return {"place": header.get("name"), "best_windows": windows, "summary": summary}
@@ -1,20 +1,30 @@
 """Weather API integration tools for running conditions forecast."""
 
+import asyncio
+import json
 import os
+import re
 
 import requests
-from dotenv import load_dotenv
-from geopy.exc import GeocoderServiceError, GeocoderTimedOut
-from geopy.geocoders import Nominatim
+from pydantic import Field
 
+from .concurrency import run_blocking
+from .forecast_cache import ForecastCache
+from .geocoding import geocoder
+from .http_client import get_async_client
 from .mcp_utils import mcp
+from .singleflight import coalesce
+from .weather_analysis import best_windows
 
 # -------------------------------- Globals --------------------------------
-load_dotenv()
 token = os.getenv("WEATHER_API_KEY")
+MISSING_KEY_ERROR = "Error: WEATHER_API_KEY not found in .env file"
 if not token:
-    print("Error: WEATHER_API_KEY not found in .env file")
-    exit(1)
+    print(MISSING_KEY_ERROR)  # the weather tools answer with this error
+
+forecast_cache = ForecastCache()  # filtered forecasts by geohash cell
+FORECAST_URL = "http://api.openweathermap.org/data/2.5/forecast"
+RUNNING_WINDOWS_MAX = int(os.getenv("RUNNING_WINDOWS_MAX", "10"))
 
 
 # -------------------------------- Tools --------------------------------
@@ -22,39 +32,161 @@ if not token:
     title="Get Weather Predictions",
     description="Return some future weather information for where the user lives. the place where the user lives is found by looking at where previous runs is located ",
 )
-def get_weather_prediction(place_name: str) -> str:
+@coalesce()  # the same forecast for everyone
+async def get_weather_prediction(place_name: str) -> str:
     """Loads positions from run_positions.txt and returns weather forecast as a dict."""
-    base_url = "http://api.openweathermap.org/data/2.5/forecast"
+    return str(await _get_forecast(place_name))
+
+
+@mcp.tool(
+    title="Get Best Running Windows",
+    description="Return the best daylight time slots to run in the next days at a place, scored on temperature, humidity, wind and rain, with a short summary of the forecast",
+)
+async def get_best_running_windows(
+    place_name: str,
+    top: int = Field(
+        description="The number of time slots to return, best first",
+        default=3,
+        ge=1,
+        le=RUNNING_WINDOWS_MAX,
+    ),
+) -> str:
+    """Scores every forecast slot for running and returns the best ones as JSON."""
+    forecast = await _get_forecast(place_name)
+    if isinstance(forecast, str):
+        return forecast
+    return json.dumps(best_windows(forecast, top=top))
+
+
+@mcp.tool(
+    title="Get Weather Predictions for Several Places",
+    description="Return the weather forecast of several places at once, to compare candidate run locations. Each place is a place name or 'lat,lon' coordinates",
+)
+async def get_weather_predictions(places: list[str]) -> str:
+    """Returns the forecast of every place in a single JSON list.
 
-    longitude, latitude = _get_coordinates(place_name)
-    params = {
-        "lat": longitude,
-        "lon": latitude,
+    Place names are geocoded in a single blocking call, and places falling in
+    the same forecast cell share one forecast request over the pooled HTTP
+    client.
+    """
+    if not token:
+        return MISSING_KEY_ERROR
+
+    # Nominatim is throttled to one request per second: the names queue in one
+    # thread instead of holding one thread of the blocking pool each
+    names = list(dict.fromkeys(p for p in places if _parse_coordinates(p) is None))
+    geocoded = dict(zip(names, await run_blocking(_geocode_places, names)))
+    resolved = [_parse_coordinates(place) or geocoded[place] for place in places]
+
+    cells: dict[str, tuple[float, float]] = {}
+    for coordinates in resolved:
+        if isinstance(coordinates, tuple):
+            cells.setdefault(forecast_cache.cell(*coordinates), coordinates)
+
+    async def forecast(lat, lon):
+        return await forecast_cache.aget(lat, lon, lambda: _fetch_forecast(lat, lon))
+
+    forecasts = dict(
+        zip(
+            cells,
+            await asyncio.gather(
+                *(forecast(*coordinates) for coordinates in cells.values()),
+                return_exceptions=True,
+            ),
+        )
+    )
+
+    results = []
+    for place, coordinates in zip(places, resolved):
+        if not isinstance(coordinates, tuple):
+            error = coordinates or "Failed to get coordinates"
+            results.append({"place": place, "error": str(error)})
+            continue
+        cell = forecast_cache.cell(*coordinates)
+        result = {"place": place, "lat": coordinates[0], "lon": coordinates[1]}
+        if isinstance(forecasts[cell], Exception):
+            result["error"] = str(forecasts[cell])
+        else:
+            result["forecast"] = forecasts[cell]
+        results.append(result)
+    return json.dumps(results)
+
+
+# -------------------------------- Useful functions --------------------------------
+# get the filtered forecast of a place name
+async def _get_forecast(place_name: str) -> list | str:
+    """Get the filtered forecast of a place name, from the cache if possible"""
+    if not token:
+        return MISSING_KEY_ERROR
+    coordinates = await run_blocking(_get_coordinates, place_name)  # geopy blocks
+    if isinstance(coordinates, str):
+        return coordinates
+    longitude, latitude = coordinates
+
+    # Served from the cache until the next 3-hour forecast slot
+    return await forecast_cache.aget(
+        latitude, longitude, lambda: _fetch_forecast(latitude, longitude)
+    )
+
+
+async def _fetch_forecast(latitude: float, longitude: float) -> list:
+    """Fetch the forecast of a location over the pooled HTTP client"""
+    response = await get_async_client().get(
+        FORECAST_URL, params=_forecast_params(latitude, longitude)
+    )
+    response.raise_for_status()
+    return filter_weather_data(response.json())  # keep only relevant data
+
+
+def _forecast_params(latitude: float, longitude: float) -> dict:
+    """Query parameters of the 5-day/3-hour forecast of a location"""
+    return {
+        "lat": latitude,
+        "lon": longitude,
         "appid": token,
         "exclude": "current,minutely,alerts",
     }
 
-    response = requests.get(base_url, params=params, timeout=10)
-    response = filter_weather_data(response.json())  # filter out to keep relevant data
-    return str(response)
+
+# parse "lat,lon" coordinates given instead of a place name
+def _parse_coordinates(text: str) -> tuple[float, float] | None:
+    """Return (lat, lon) if the text is a pair of decimal coordinates"""
+    match = re.fullmatch(r"\s*(-?\d+(?:\.\d+)?)\s*,\s*(-?\d+(?:\.\d+)?)\s*", text)
+    if not match:
+        return None
+    lat, lon = float(match[1]), float(match[2])
+    if -90 <= lat <= 90 and -180 <= lon <= 180:
+        return lat, lon
+    return None
 
 
-# -------------------------------- Useful functions --------------------------------
 # get the coordinates of a place name
 def _get_coordinates(place_name: str) -> tuple:
     """Get the coordinates of a place name"""
-    geolocator = Nominatim(user_agent="my_geocoder_app")
     try:
-        location = geolocator.geocode(place_name)
-    except (GeocoderTimedOut, GeocoderServiceError) as e:
+        location = geocoder.geocode(place_name)  # shared cache and throttle
+    except requests.RequestException as e:
         print("Error:", e)
         return "Failed to get coordinates"
     if location:
-        return (location.longitude, location.latitude)
+        latitude, longitude = location
+        return (longitude, latitude)
     else:
         return "Failed to get coordinates"
 
 
+# geocode several place names
+def _geocode_places(place_names: list[str]) -> list:
+    """Geocode place names one after the other, keeping the error of each"""
+    results = []
+    for place_name in place_names:
+        try:
+            results.append(geocoder.geocode(place_name))
+        except requests.RequestException as e:
+            results.append(e)
+    return results
+
+
 # Keep only the relevant fields from the weather data
 def filter_weather_data(data):
     """Simplify OpenWeatherMap 5-day/3-hour forecast data, keeping:
@@ -0,0 +1,80 @@
+"""
+Simple tests for the local activity store
+"""
+
+import os
+import sys
+from datetime import UTC, datetime, timedelta
+from types import SimpleNamespace
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from stravalib.model import AthleteStats, SummaryActivity
+
+from chathletique_mcp.activity_store import ActivityStore
+
+
+def make_activity(activity_id, start_date):
+    return SummaryActivity.model_validate(
+        {
+            "id": activity_id,
+            "name": f"Run {activity_id}",
+            "type": "Run",
+            "start_date": start_date.isoformat(),
+            "distance": 10000,
+            "average_speed": 3.0,
+        }
+    )
+
+
+class FakeClient:
+    """Stand-in for stravalib.Client recording the API calls"""
+
+    access_token = "token"  # noqa: S105
+
+    def __init__(self, activities):
+        self.activities = activities
+        self.calls = []
+
+    def get_athlete(self):
+        self.calls.append("get_athlete")
+        return SimpleNamespace(id=42)
+
+    def get_activities(self, after=None, limit=None):
+        self.calls.append(("get_activities", after))
+        return [a for a in self.activities if after is None or a.start_date > after]
+
+    def get_athlete_stats(self, athlete_id):
+        self.calls.append("get_athlete_stats")
+        return AthleteStats.model_validate({"recent_run_totals": {"count": 1}})
+
+
+def test_sync_fetches_only_the_delta(tmp_path):
+    """Test that the second sync uses the newest start_date as cursor"""
+    day = datetime(2024, 5, 1, tzinfo=UTC)
+    client = FakeClient([make_activity(1, day), make_activity(2, day + timedelta(1))])
+    store = ActivityStore(tmp_path / "store.sqlite3", sync_interval=0)
+
+    assert store.sync(client, 42) == 2
+    client.activities.append(make_activity(3, day + timedelta(2)))
+    assert store.sync(client, 42) == 1
+
+    assert ("get_activities", day + timedelta(1)) in client.calls
+    assert [a.id for a in store.recent_activities(42, limit=2)] == [3, 2]
+
+
+def test_sync_interval_and_stats(tmp_path):
+    """Test that reads within the sync interval make no API call"""
+    client = FakeClient([make_activity(1, datetime(2024, 5, 1, tzinfo=UTC))])
+    store = ActivityStore(tmp_path / "store.sqlite3", sync_interval=3600)
+
+    athlete_id = store.athlete_id(client)
+    store.sync(client, athlete_id)
+    calls = len(client.calls)
+    assert store.athlete_id(client) == 42
+    assert store.sync(client, athlete_id) == 0
+
+    assert len(client.calls) == calls
+    assert store.athlete_stats(42).recent_run_totals.count == 1
+    assert store.athlete_stats(7) is None
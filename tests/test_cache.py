@@ -0,0 +1,28 @@
+"""
+Simple tests for the in-memory TTL cache
+"""
+
+import os
+import sys
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from chathletique_mcp.cache import TTLCache
+
+
+def test_ttl_cache_lru_and_expiry():
+    """Test LRU eviction and per-entry expiry"""
+    now = [0.0]
+    cache = TTLCache(maxsize=2, ttl=10, clock=lambda: now[0])
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)  # evicts "b", the least recently used
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+
+    now[0] = 11.0
+    assert cache.get("a") is None
+    assert cache.stats()["evictions"] == 1
@@ -0,0 +1,34 @@
+"""
+Simple tests for the pooled Strava clients
+"""
+
+import os
+import sys
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from chathletique_mcp.client_pool import StravaClientPool
+
+
+def test_pool_reuses_clients_and_session():
+    """Test that one token gets one client and all clients share a session"""
+    pool = StravaClientPool()
+
+    first = pool.get("token-a")
+    assert pool.get("token-a") is first
+
+    other = pool.get("token-b")
+    assert other is not first
+    assert other.protocol.rsession is first.protocol.rsession is pool.session
+
+
+def test_pool_evicts_idle_clients():
+    """Test that unused clients are dropped after the idle timeout"""
+    pool = StravaClientPool(idle_timeout=-1)
+
+    first = pool.get("token-a")
+    pool.get("token-b")
+
+    assert len(pool) == 1
+    assert pool.get("token-a") is not first
@@ -0,0 +1,129 @@
+"""
+Simple tests for the bounded concurrent fan-out
+"""
+
+import asyncio
+import contextvars
+import inspect
+import os
+import sys
+import threading
+import time
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from chathletique_mcp import concurrency
+from chathletique_mcp.concurrency import fan_out, offload
+
+
+def test_fan_out_isolates_errors_and_yields_in_arrival_order():
+    """Test that a failing item does not abort the others"""
+
+    def work(item):
+        time.sleep(item / 100)
+        if item == 2:
+            raise ValueError("boom")
+        return item * 10
+
+    results = list(fan_out(work, [3, 1, 2], max_workers=3))
+
+    assert [r.item for r in results] == [1, 2, 3]
+    assert [r.value for r in results] == [10, None, 30]
+    assert isinstance(results[1].error, ValueError)
+
+
+def test_fan_out_bounds_concurrency():
+    """Test that no more than max_workers calls run at the same time"""
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def work(item):
+        with lock:
+            running.append(item)
+            peak.append(len(running))
+        time.sleep(0.01)
+        with lock:
+            running.remove(item)
+        return item
+
+    results = list(fan_out(work, range(8), max_workers=2))
+
+    assert len(results) == 8
+    assert max(peak) <= 2
+
+
+def test_concurrent_fan_outs_share_the_process_limit(monkeypatch):
+    """Test that several fan-outs at once stay within FAN_OUT_LIMIT calls"""
+    monkeypatch.setattr(concurrency, "_fan_out_slots", threading.BoundedSemaphore(3))
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def work(item):
+        with lock:
+            running.append(item)
+            peak.append(len(running))
+        time.sleep(0.01)
+        with lock:
+            running.remove(item)
+        return item
+
+    def tool(name):
+        items = [(name, i) for i in range(6)]
+        return list(fan_out(work, items, max_workers=4))
+
+    threads = [threading.Thread(target=tool, args=(name,)) for name in "ab"]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(peak) == 12
+    assert max(peak) <= 3
+
+
+def test_fan_out_early_exit_cancels_pending_items():
+    """Test that leaving the loop early does not run the remaining items"""
+    started = []
+
+    def work(item):
+        started.append(item)
+        time.sleep(0.02)
+        return item
+
+    for result in fan_out(work, range(20), max_workers=2):
+        if result.value is not None:
+            break
+
+    time.sleep(0.05)
+    assert len(started) < 20
+
+
+def test_offload_runs_off_the_event_loop_with_the_context():
+    """Test that an offloaded call keeps its signature, context and the loop free"""
+    request = contextvars.ContextVar("request")
+
+    @offload
+    def tool(place: str, top: int = 3) -> str:
+        time.sleep(0.05)
+        return f"{request.get()}:{place}:{top}:{threading.current_thread().name}"
+
+    async def scenario():
+        request.set("r1")
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            for _ in range(5):
+                await asyncio.sleep(0.005)
+                ticks += 1
+
+        result, _ = await asyncio.gather(tool("Paris"), ticker())
+        return result, ticks
+
+    result, ticks = asyncio.run(scenario())
+    assert list(inspect.signature(tool).parameters) == ["place", "top"]
+    assert result.startswith("r1:Paris:3:blocking")
+    assert ticks == 5  # the loop kept running during the blocking call
@@ -0,0 +1,46 @@
+"""
+Simple tests for the memory-mapped elevation tiles
+"""
+
+import os
+import sys
+
+import numpy as np
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from chathletique_mcp.elevation import VOID, ElevationTiles, gain_loss, tile_name
+
+
+def slope_tile(size=11):
+    """Synthetic tile rising 1000 m from the south to the north edge."""
+    lat = np.linspace(49.0, 48.0, size)  # north row first, like SRTM
+    return np.repeat((100 + 1000 * (lat - 48.0))[:, None], size, axis=1)
+
+
+def test_hgt_tiles_are_sampled_bilinearly(tmp_path):
+    """Test sampling an SRTM .hgt tile, with voids and missing tiles"""
+    grid = np.round(slope_tile()).astype(">i2")
+    grid[0, 0] = VOID
+    grid.tofile(tmp_path / "N48E002.hgt")
+    tiles = ElevationTiles(tmp_path)
+
+    elevations = tiles.sample([48.5, 48.25, 48.99, 47.5], [2.5, 2.3, 2.01, 2.5])
+
+    assert np.allclose(elevations[:2], [600, 350])
+    assert np.isnan(elevations[2])  # next to the void
+    assert np.isnan(elevations[3])  # no tile
+    assert tile_name(-0.5, -73.2) == "S01W074"
+
+
+def test_climb_along_a_path(tmp_path):
+    """Test the gain and loss of an out-and-back run on a .npy tile"""
+    np.save(tmp_path / "N48E002.npy", slope_tile().astype(np.float32))
+    tiles = ElevationTiles(tmp_path)
+
+    gain, loss = tiles.climb([(48.1, 2.5), (48.2, 2.5), (48.15, 2.5)])
+
+    assert np.isclose(gain, 100, atol=1)
+    assert np.isclose(loss, 50, atol=1)
+    assert gain_loss([10, np.nan, 30, 20]) == (20.0, 10.0)
@@ -0,0 +1,112 @@
+"""
+Simple tests for the forecast cache
+"""
+
+import asyncio
+import os
+import sys
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from chathletique_mcp.forecast_cache import ForecastCache, next_slot
+
+SLOT_START = 1_760_000_400  # 09:00 UTC, start of a forecast slot
+
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def returning(value):
+    """Coroutine function fetching a fixed forecast"""
+
+    async def fetch():
+        return value
+
+    return fetch
+
+
+def test_forecasts_are_cached_per_cell_until_the_next_slot():
+    """Test the cell key and the slot-aligned expiry"""
+    clock = FakeClock(SLOT_START + 600)
+    cache = ForecastCache(clock=clock)
+    calls = []
+
+    async def fetch():
+        calls.append(clock.now)
+        return [{"name": "Paris"}]
+
+    async def scenario():
+        first = await cache.aget(48.8566, 2.3522, fetch)
+        # A few hundred meters away, later in the same slot
+        clock.now = SLOT_START + 3 * 3600 - 1
+        return first, await cache.aget(48.8580, 2.3540, fetch)
+
+    assert asyncio.run(scenario()) == ([{"name": "Paris"}], [{"name": "Paris"}])
+    assert len(calls) == 1
+    assert next_slot(SLOT_START) == next_slot(SLOT_START + 600) == SLOT_START + 10800
+
+
+def test_stale_forecasts_are_served_while_refreshed():
+    """Test stale-while-revalidate after the slot ends"""
+    clock = FakeClock(SLOT_START)
+    cache = ForecastCache(clock=clock, stale_ttl=3600)
+
+    async def scenario():
+        await cache.aget(48.8566, 2.3522, returning("old"))
+        clock.now = SLOT_START + 3 * 3600 + 60
+        stale = await cache.aget(48.8566, 2.3522, returning("new"))
+        await asyncio.gather(*cache._tasks)  # the refresh runs in the background
+        refreshed = await cache.aget(48.8566, 2.3522, returning("newer"))
+
+        # Past the stale window the forecast is fetched again before answering
+        clock.now = SLOT_START + 10 * 3600
+        return stale, refreshed, await cache.aget(48.8566, 2.3522, returning("fresh"))
+
+    assert asyncio.run(scenario()) == ("old", "new", "fresh")
+
+
+def test_async_forecasts_refresh_in_a_task():
+    """Test the async path with a coroutine fetch"""
+    clock = FakeClock(SLOT_START)
+    cache = ForecastCache(clock=clock)
+
+    async def scenario():
+        async def fetch_old():
+            return "old"
+
+        async def fetch_new():
+            return "new"
+
+        first = await cache.aget(48.8566, 2.3522, fetch_old)
+        clock.now = SLOT_START + 3 * 3600
+        stale = await cache.aget(48.8566, 2.3522, fetch_new)
+        await asyncio.gather(*cache._tasks)
+        return first, stale, await cache.aget(48.8566, 2.3522, fetch_old)
+
+    assert asyncio.run(scenario()) == ("old", "old", "new")
+
+
+def test_concurrent_async_misses_share_one_fetch():
+    """Test that concurrent cold requests of a cell fetch the forecast once"""
+    cache = ForecastCache(clock=FakeClock(SLOT_START))
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "forecast"
+
+    async def scenario():
+        # Two points of the same ~5 km cell
+        return await asyncio.gather(
+            cache.aget(48.8566, 2.3522, fetch), cache.aget(48.8570, 2.3530, fetch)
+        )
+
+    assert asyncio.run(scenario()) == ["forecast", "forecast"]
+    assert len(calls) == 1
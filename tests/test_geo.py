@@ -0,0 +1,76 @@
+"""
+Simple tests for the vectorized geodesic helpers
+"""
+
+import os
+import sys
+
+import numpy as np
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from chathletique_mcp.geo import (
+    bearing_deg,
+    geohash_cover,
+    geohash_encode,
+    haversine_m,
+    offset_point,
+    path_overlap,
+    rank_candidate_paths,
+)
+
+
+def test_haversine_is_vectorized():
+    """Test one degree of latitude and broadcasting over arrays"""
+    d = haversine_m(48.0, 2.0, np.array([49.0, 48.0]), np.array([2.0, 2.0]))
+
+    assert np.isclose(d[0], 111_195, rtol=1e-3)
+    assert d[1] == 0
+
+
+def test_rank_candidate_paths_discards_impossible_segments():
+    """Test that too far and too close paths never reach the router"""
+    start = (48.85, 2.35)
+    km = 1 / 111.195  # one km of latitude in degrees
+    paths = [
+        [start, (48.85 + 4 * km, 2.35)],  # 4 km crow flight: always too long
+        [start, (48.85 + 0.5 * km, 2.35)],  # 0.5 km: too short even with detours
+        [start, (48.85 + 2.5 * km, 2.35)],  # 2.5 km: close to the window center
+        [start, (48.85 + 2.2 * km, 2.35)],  # 2.2 km: plausible
+    ]
+
+    ranked = rank_candidate_paths(paths, low=3000, high=3500, detour_factor=1.5)
+
+    assert list(ranked) == [2, 3]
+    assert len(rank_candidate_paths([], 3000, 3500)) == 0
+
+
+def test_offset_point_scales_longitude_with_latitude():
+    """Test that an eastward offset keeps its length in meters at 60 degrees"""
+    lat, lon = offset_point(60.0, 10.0, 90.0, 1000.0)
+
+    assert np.isclose(lat, 60.0)
+    assert np.isclose(haversine_m(60.0, 10.0, lat, lon), 1000.0, rtol=1e-3)
+    assert np.isclose(bearing_deg(60.0, 10.0, lat, lon), 90.0, atol=0.1)
+    assert np.isclose(bearing_deg(48.0, 2.0, 47.0, 2.0), 180.0)
+
+
+def test_path_overlap_between_parallel_paths():
+    """Test that overlap tolerates a few meters of offset but not a block"""
+    path = [(48.85, 2.35), (48.86, 2.35)]
+
+    assert path_overlap(path, [(48.85, 2.3502), (48.86, 2.3502)]) == 1.0
+    assert path_overlap(path, [(48.85, 2.36), (48.86, 2.36)]) == 0.0
+    assert 0.4 < path_overlap(path, [(48.85, 2.35), (48.855, 2.35)]) < 0.6
+
+
+def test_geohash_cover_contains_every_point_of_the_bounds():
+    """Test that the cover cells are prefixes of the geohash of any inner point"""
+    bounds = [48.84, 2.30, 48.86, 2.33]
+    cells = geohash_cover(bounds, max_cells=16)
+
+    assert 0 < len(cells) <= 16
+    rng = np.random.default_rng(0)
+    for lat, lon in zip(rng.uniform(48.84, 48.86, 200), rng.uniform(2.30, 2.33, 200)):
+        assert any(geohash_encode(lat, lon).startswith(cell) for cell in cells)
@@ -0,0 +1,67 @@
+"""
+Simple tests for the shared geocoding service
+"""
+
+import os
+import sys
+import threading
+import time
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from chathletique_mcp.geocoding import Geocoder, normalize_query
+
+
+def test_normalize_query():
+    """Test that equivalent spellings share a cache key"""
+    assert normalize_query("  Opéra ,  PARIS ") == normalize_query("opéra, paris")
+    assert normalize_query("Paris", "fr") != normalize_query("Paris")
+
+
+def test_geocode_is_cached_and_persisted(tmp_path, monkeypatch):
+    """Test that a place is only requested once, even across instances"""
+    calls = []
+
+    def fake_request(self, place_name, language):
+        calls.append(place_name)
+        return None if place_name == "Nowhere" else (48.8566, 2.3522)
+
+    monkeypatch.setattr(Geocoder, "_request", fake_request)
+    geocoder = Geocoder(tmp_path / "geo.sqlite3", min_interval=0)
+
+    assert geocoder.geocode("Paris") == (48.8566, 2.3522)
+    assert geocoder.geocode(" paris ") == (48.8566, 2.3522)
+    assert geocoder.geocode("Nowhere") is None
+    assert geocoder.geocode("Nowhere") is None
+    assert calls == ["Paris", "Nowhere"]
+
+    restarted = Geocoder(tmp_path / "geo.sqlite3", min_interval=0)
+    assert restarted.geocode("PARIS") == (48.8566, 2.3522)
+    assert len(calls) == 2
+
+
+def test_concurrent_lookups_are_throttled_and_coalesced(tmp_path, monkeypatch):
+    """Test that concurrent users of the same place share one request"""
+    calls = []
+    monkeypatch.setattr(
+        Geocoder, "_request", lambda self, name, lang: calls.append(name) or (1, 2)
+    )
+    geocoder = Geocoder(tmp_path / "geo.sqlite3", min_interval=0.05)
+    cache_set = geocoder.cache.set
+
+    def slow_cache_set(*args, **kwargs):
+        time.sleep(0.02)  # queued lookups must not get ahead of the cache
+        cache_set(*args, **kwargs)
+
+    monkeypatch.setattr(geocoder.cache, "set", slow_cache_set)
+
+    threads = [
+        threading.Thread(target=geocoder.geocode, args=("Lyon",)) for _ in range(5)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert calls == ["Lyon"]
@@ -0,0 +1,54 @@
+"""
+Simple tests for the shared async HTTP client
+"""
+
+import asyncio
+import gc
+import os
+import sys
+import threading
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from chathletique_mcp import http_client
+from chathletique_mcp.http_client import get_async_client
+
+
+def test_one_client_per_event_loop():
+    """Test that the client is reused within a loop and renewed across loops"""
+
+    async def clients():
+        return get_async_client(), get_async_client()
+
+    first, same = asyncio.run(clients())
+    other, _ = asyncio.run(clients())
+
+    assert first is same
+    assert other is not first
+
+
+def test_clients_of_concurrent_loops_do_not_replace_each_other():
+    """Test that each running loop keeps its own client until the loop is gone"""
+    started = threading.Barrier(2)
+    clients = {}
+
+    def run(name):
+        async def use():
+            first = get_async_client()
+            started.wait()  # both loops are running now
+            await asyncio.sleep(0.01)
+            clients[name] = (first, get_async_client())
+
+        asyncio.run(use())
+
+    threads = [threading.Thread(target=run, args=(name,)) for name in "ab"]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert all(first is again for first, again in clients.values())
+    assert clients["a"][0] is not clients["b"][0]
+    gc.collect()
+    assert len(http_client._clients) == 0  # dropped with their loops
@@ -0,0 +1,89 @@
+"""
+Simple import-time benchmark of the server modules
+"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+SRC = os.path.join(os.path.dirname(__file__), "..", "src")
+
+# Clients deferred until a tool first uses them
+DEFERRED = ["stravalib", "geopy", "openrouteservice"]
+
+# Maximum cold import time of the whole server, in milliseconds
+IMPORT_TIME_BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", "3000"))
+
+
+def cold_import(module, home):
+    """Import a module (or comma-separated modules) in a fresh interpreter.
+
+    The interpreter runs with ``home`` as its home directory, so that nothing
+    is written to the real one.
+
+    Returns:
+        tuple: Cumulative import time in ms and the top-level packages loaded,
+            or None if the module cannot be imported here.
+    """
+    code = (
+        f"import sys; import {module}; "
+        "print(' '.join(sorted({m.split('.')[0] for m in sys.modules})))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        env={
+            **{k: v for k, v in os.environ.items() if k != "CHATHLETIQUE_DATA_DIR"},
+            "PYTHONPATH": SRC,
+            "HOME": str(home),
+            "XDG_CACHE_HOME": str(home / ".cache"),
+        },
+        check=False,
+    )
+    if result.returncode != 0:
+        return None
+    total_us = 0
+    for line in result.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package", top level only
+        if line.startswith("import time:") and not line.split("|")[2].startswith("  "):
+            cumulative = line.split("|")[1].strip()
+            if cumulative.isdigit():
+                total_us += int(cumulative)
+    return total_us / 1000, set(result.stdout.split())
+
+
+@pytest.mark.parametrize(
+    "module",
+    [
+        "chathletique_mcp.activity_store",
+        "chathletique_mcp.client_pool",
+        "chathletique_mcp.geocoding",
+        "chathletique_mcp.routing",
+    ],
+)
+def test_heavy_clients_are_imported_lazily(module, tmp_path):
+    """Test that importing the modules does not import the API clients"""
+    _, loaded = cold_import(module, tmp_path)
+
+    assert not loaded & set(DEFERRED)
+    assert not any(tmp_path.iterdir())  # no store opened at import
+
+
+def test_server_cold_start_budget(tmp_path):
+    """Test the cold import time of the whole server"""
+    result = cold_import(
+        "chathletique_mcp.main, chathletique_mcp.strava_tools, "
+        "chathletique_mcp.weather_tools",
+        tmp_path,
+    )
+    if result is None:
+        pytest.skip("the server dependencies cannot be imported here")
+    elapsed_ms, loaded = result
+
+    print(f"Server modules imported in {elapsed_ms:.0f} ms")
+    assert not loaded & set(DEFERRED)
+    assert not (tmp_path / ".cache" / "chathletique-mcp").exists()
+    assert elapsed_ms < IMPORT_TIME_BUDGET_MS
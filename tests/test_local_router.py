@@ -0,0 +1,84 @@
+"""
+Simple tests for the offline walking router on a synthetic graph
+"""
+
+import os
+import sys
+
+import numpy as np
+import polyline
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from chathletique_mcp.geo import haversine_m
+from chathletique_mcp.local_router import RoadGraph
+
+
+def make_grid(n=5, step=0.001, lat0=48.85, lon0=2.35):
+    """n x n street grid, node i*n+j at (lat0 + i*step, lon0 + j*step)"""
+    lat = np.repeat(lat0 + step * np.arange(n), n)
+    lon = np.tile(lon0 + step * np.arange(n), n)
+    edges = []
+    for i in range(n):
+        for j in range(n):
+            if j + 1 < n:
+                edges.append((i * n + j, i * n + j + 1))
+            if i + 1 < n:
+                edges.append((i * n + j, (i + 1) * n + j))
+    return RoadGraph.from_edges(lat, lon, edges)
+
+
+def test_shortest_path_follows_the_grid():
+    """Test that A* returns the Manhattan distance on a grid"""
+    graph = make_grid()
+    length, path = graph.shortest_path(0, 24)
+
+    east = haversine_m(48.85, 2.35, 48.85, 2.354)
+    north = haversine_m(48.85, 2.35, 48.854, 2.35)
+    assert np.isclose(length, east + north, rtol=1e-4)
+    assert path[0] == 0 and path[-1] == 24 and len(path) == 9
+
+
+def test_route_matches_compute_route_format(tmp_path):
+    """Test loop routes, polyline output and save/load round trip"""
+    graph = make_grid()
+    graph.save(tmp_path / "grid.npz")
+    graph = RoadGraph.load(tmp_path / "grid.npz")
+
+    start = (48.85, 2.35)
+    route = graph.route(start, start, [(48.852, 2.352)])
+
+    # Out and back along the grid: 2 blocks east and 2 blocks north, twice
+    east = haversine_m(48.85, 2.35, 48.85, 2.352)
+    north = haversine_m(48.85, 2.35, 48.852, 2.35)
+    assert abs(route["distance_m"] - 2 * (east + north)) <= 1
+    assert route["duration_iso"].endswith("s")
+    points = polyline.decode(route["encoded_polyline"])
+    assert points[0] == points[-1] == start
+
+
+def test_from_osm_json_skips_non_walkable_ways():
+    """Test that motorways are not part of the walking graph"""
+    data = {
+        "elements": [
+            {"type": "node", "id": 1, "lat": 48.85, "lon": 2.35},
+            {"type": "node", "id": 2, "lat": 48.851, "lon": 2.35},
+            {"type": "node", "id": 3, "lat": 48.852, "lon": 2.35},
+            {"type": "way", "id": 10, "nodes": [1, 2], "tags": {"highway": "footway"}},
+            {"type": "way", "id": 11, "nodes": [2, 3], "tags": {"highway": "motorway"}},
+        ]
+    }
+    graph = RoadGraph.from_osm_json(data)
+
+    assert len(graph.lat) == 2
+    assert graph.route((48.85, 2.35), (48.851, 2.35))["distance_m"] > 100
+
+
+def test_route_is_none_for_stops_off_the_graph():
+    """Test that a stop far from every node is not snapped onto the graph"""
+    graph = make_grid()
+
+    assert graph.route((48.85, 2.35), (48.854, 2.354)) is not None
+    assert graph.route((48.85, 2.35), (48.90, 2.354)) is None  # ~5 km north
+    assert graph.route((48.85, 2.35), (48.854, 2.354), [(48.80, 2.30)]) is None
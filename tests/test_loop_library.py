@@ -0,0 +1,80 @@
+"""
+Simple tests for the precomputed loop library
+"""
+
+import os
+import sys
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from chathletique_mcp.loop_library import LoopLibrary, rank_loops
+
+OPERA = (48.8719697, 2.3316014)
+
+
+def make_loop(distance_m=10_020):
+    return {
+        "waypoints": [(48.87, 2.34), (48.88, 2.35), (48.875, 2.32)],
+        "distance_m": distance_m,
+        "polyline": "_p~iF~ps|U_ulLnnqC",
+    }
+
+
+def test_lookup_serves_loops_of_the_same_cell_and_distance(tmp_path):
+    """Test that a stored loop is served from nearby starts only"""
+    library = LoopLibrary(tmp_path / "loops.sqlite3")
+    library.store(OPERA, 10, make_loop())
+
+    loop = library.lookup((48.87197, 2.33161), 10)
+    assert loop["start"] == OPERA
+    assert loop["waypoints"][0] == (48.87, 2.34)
+    assert loop["distance_m"] == 10_020
+    assert library.lookup(OPERA, 5) is None
+    assert library.lookup((48.8584, 2.2945), 10) is None
+
+
+def test_refresh_stocks_places_and_expired_loops_are_purged(tmp_path):
+    """Test the background refresh and the expiry of the loops"""
+    library = LoopLibrary(tmp_path / "loops.sqlite3", per_cell=3)
+    built = []
+
+    def build(start, distance_m):
+        built.append(distance_m)
+        return make_loop(distance_m)
+
+    places = {"Opéra, Paris": OPERA, "Nowhere": None}
+    added = library.refresh(list(places), [5, 10], build, places.get)
+    assert added == 6
+    assert built == [5000, 5000, 5000, 10000, 10000, 10000]
+    # Already stocked: nothing to build
+    assert library.refresh(list(places), [5, 10], build, places.get) == 0
+
+    expired = LoopLibrary(tmp_path / "loops.sqlite3", ttl=-1)
+    expired.store(OPERA, 21, make_loop(21_000))
+    assert expired.lookup(OPERA, 21) is None
+    assert expired.purge() == 1
+    assert expired.count(OPERA, 10) == 3
+
+
+def test_rank_loops_prefers_accurate_and_distinct_loops():
+    """Test the ranking of alternatives on distance error and overlap"""
+    east = [(48.872, 2.335), (48.873, 2.34), (48.874, 2.345), (48.875, 2.35)]
+    north = [(48.875, 2.332), (48.88, 2.332), (48.885, 2.332), (48.89, 2.332)]
+    loops = [
+        {"start": OPERA, "waypoints": east, "distance_m": 10_050, "polyline": None},
+        {"start": OPERA, "waypoints": east, "distance_m": 10_050, "polyline": None},
+        {
+            "start": OPERA,
+            "waypoints": [*east[:3], (48.8755, 2.3505)],
+            "distance_m": 10_000,
+            "polyline": None,
+        },
+        {"start": OPERA, "waypoints": north, "distance_m": 10_060, "polyline": None},
+    ]
+
+    ranked = rank_loops(loops, 10_000, k=3)
+
+    # The exact loop first, then the distinct one before its near duplicate
+    assert [loop["distance_m"] for loop in ranked] == [10_000, 10_060, 10_050]
+    assert len(rank_loops(loops, 10_000, k=10)) == 3
@@ -2,14 +2,24 @@
 Simple tests for MCP utilities
 """
 
+import asyncio
+import contextvars
 import os
 import sys
 
+import httpx
 import pytest
+from mcp.server.auth.middleware.auth_context import auth_context_var
+from mcp.server.auth.middleware.bearer_auth import AuthenticatedUser
+from mcp.shared.auth import OAuthClientInformationFull
 
 # Add src to path for imports
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
 
+from chathletique_mcp import mcp_utils, state_store
+from chathletique_mcp.state_store import MemoryStateStore, SQLiteStateStore
+from chathletique_mcp.token_registry import TokenRegistry
+
 
 def test_mcp_import():
     """Test that mcp_utils can be imported successfully"""
@@ -45,3 +55,123 @@ def test_main_module_import():
         assert main is not None
     except ImportError as e:
         pytest.skip(f"Could not import main: {e}")
+
+
+def test_token_verifier_caches_results(monkeypatch):
+    """Test that a verified token is not checked against Strava again"""
+    requests_seen = []
+
+    def athlete(request):
+        requests_seen.append(request)
+        if request.headers["Authorization"] == "Bearer good":
+            return httpx.Response(200, json={"id": 42})
+        return httpx.Response(401)
+
+    async def scenario():
+        client = httpx.AsyncClient(transport=httpx.MockTransport(athlete))
+        monkeypatch.setattr(mcp_utils, "get_async_client", lambda: client)
+        try:
+            verifier = mcp_utils.token_verifier
+            verifier.cache.clear()
+            first = await asyncio.gather(
+                *(verifier.verify_token("good") for _ in range(3))
+            )
+            # the served auth provider validates the bearer tokens with it
+            again = await mcp_utils.auth.verify_token("good")
+            rejected = [await verifier.verify_token("bad") for _ in range(2)]
+        finally:
+            await client.aclose()
+        return first, again, rejected
+
+    first, again, rejected = asyncio.run(scenario())
+    assert all(token.claims["athlete_id"] == 42 for token in first)
+    assert again.claims["athlete_id"] == 42
+    assert rejected == [None, None]
+    assert len(requests_seen) == 2
+
+
+def test_current_token_is_the_one_of_the_authenticated_athlete(monkeypatch):
+    """Test that each authenticated athlete gets their own registry token"""
+    registry = TokenRegistry(store=MemoryStateStore())
+    registry.put(1, {"access_token": "token-1", "expires_at": None})
+    registry.put(2, {"access_token": "token-2", "expires_at": None})
+    monkeypatch.setattr(mcp_utils, "token_registry", registry)
+
+    def token_of(athlete_id):
+        access = mcp_utils.AccessToken(
+            token=f"bearer-{athlete_id}",
+            client_id=str(athlete_id),
+            scopes=[],
+            claims={"athlete_id": athlete_id},
+        )
+        auth_context_var.set(AuthenticatedUser(access))
+        return mcp_utils.get_current_token()
+
+    assert contextvars.copy_context().run(token_of, 1) == "token-1"
+    assert contextvars.copy_context().run(token_of, 2) == "token-2"
+    assert contextvars.copy_context().run(token_of, 3) == "bearer-3"
+
+
+def test_served_server_authenticates_requests():
+    """Test that the served MCP server uses the Strava OAuth provider"""
+    assert mcp_utils.mcp.auth is mcp_utils.auth
+
+
+def test_oauth_flow_can_span_workers(monkeypatch, tmp_path):
+    """Test that a worker finishes the OAuth flow another one started"""
+    registry = TokenRegistry(store=MemoryStateStore())
+    monkeypatch.setattr(mcp_utils, "token_registry", registry)
+    path = tmp_path / "state.sqlite3"
+    workers = []
+    for _ in range(2):
+        proxy = mcp_utils.SharedOAuthProxy(
+            upstream_authorization_endpoint="https://strava.test/authorize",
+            upstream_token_endpoint="https://strava.test/token",  # noqa: S106
+            upstream_client_id="id",
+            upstream_client_secret="secret",  # noqa: S106
+            token_verifier=mcp_utils.StravaTokenVerifier(),
+            base_url="https://mcp.test",
+        )
+        workers.append((proxy, SQLiteStateStore(path)))
+
+    def on(worker, call):
+        proxy, store = worker
+        monkeypatch.setattr(state_store, "_state_store", store)
+        return asyncio.run(call(proxy))
+
+    client = OAuthClientInformationFull(
+        client_id="client", redirect_uris=["http://localhost/callback"]
+    )
+    on(workers[0], lambda proxy: proxy.register_client(client))
+    registered = on(workers[1], lambda proxy: proxy.get_client("client"))
+    assert registered.client_id == "client"
+
+    # The Strava callback reached the first worker
+    workers[0][0]._client_codes["code"] = {
+        "client_id": "client",
+        "redirect_uri": "http://localhost/callback",
+        "code_challenge": "challenge",
+        "code_challenge_method": "S256",
+        "scopes": [],
+        "idp_tokens": {
+            "access_token": "strava-access",
+            "refresh_token": "strava-refresh",
+            "token_type": "Bearer",
+            "expires_in": 21600,
+            "athlete": {"id": 7},
+        },
+        "expires_at": 2**40,
+        "created_at": 0,
+    }
+
+    async def exchange(proxy):
+        code = await proxy.load_authorization_code(registered, "code")
+        return await proxy.exchange_authorization_code(registered, code)
+
+    token = on(workers[1], exchange)
+    assert token.access_token == "strava-access"  # noqa: S105
+    assert registry.get(7) == "strava-access"
+    refresh = on(
+        workers[0], lambda proxy: proxy.load_refresh_token(registered, "strava-refresh")
+    )
+    assert refresh.client_id == "client"
@@ -0,0 +1,117 @@
+"""
+Simple tests for the loop search of the itinerary planner
+"""
+
+import os
+import sys
+import time
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from chathletique_mcp import strava_tools
+
+START = (48.85, 2.35)
+
+
+def make_segment(i):
+    lat = 48.875 + 0.002 * i  # about 3 km north of the start
+    points = [(lat, 2.35 + 0.001 * j) for j in range(5)]
+    return {
+        "id": i,
+        "name": f"segment {i}",
+        "distance_m": 400.0,
+        "points": points,
+        "start_latlng": points[0],
+        "end_latlng": points[-1],
+    }
+
+
+class FakeSegmentIndex:
+    def segments_for(self, bounds, fetch):
+        return [[make_segment(i) for i in range(4)]]
+
+
+def test_plan_loops_ranks_every_candidate(monkeypatch):
+    """Test that the best loop wins even when it is the slowest to find"""
+
+    def fake_compute_route(origin, destination, waypoints=None, mode="WALK"):
+        if origin != destination:  # reaching the segment from the start
+            return {"distance_m": 4000}
+        i = round((waypoints[0][0] - 48.875) / 0.002)
+        time.sleep(0.01 * (4 - i))  # the most accurate loop comes last
+        return {"distance_m": 10_000 + 30 * i, "encoded_polyline": None}
+
+    monkeypatch.setattr(strava_tools, "segment_index", FakeSegmentIndex())
+    monkeypatch.setattr(strava_tools, "get_ors_client", lambda: None)
+    monkeypatch.setattr(strava_tools, "compute_route", fake_compute_route)
+    monkeypatch.setattr(strava_tools, "get_elevation", lambda: None)
+    monkeypatch.setattr(strava_tools, "ITINERARY_OVERSAMPLE", 4)
+
+    loops = strava_tools.plan_loops(START, 10_000, k=2)
+
+    assert loops[0]["distance_m"] == 10_000
+    assert len(loops) == 2
+
+
+def test_single_loop_search_stops_at_the_first_fit(monkeypatch):
+    """Test that one loop is not oversampled: the search stops once it fits"""
+    loop_calls = []
+
+    def fake_compute_route(origin, destination, waypoints=None, mode="WALK"):
+        if origin != destination:
+            return {"distance_m": 4000}
+        i = round((waypoints[0][0] - 48.875) / 0.002)
+        loop_calls.append(i)
+        if i == 3:  # the only segment fitting the distance, found at once
+            return {"distance_m": 10_000, "encoded_polyline": None}
+        time.sleep(0.02)
+        return {"distance_m": 12_000, "encoded_polyline": None}
+
+    monkeypatch.setattr(strava_tools, "segment_index", FakeSegmentIndex())
+    monkeypatch.setattr(strava_tools, "get_ors_client", lambda: None)
+    monkeypatch.setattr(strava_tools, "compute_route", fake_compute_route)
+    monkeypatch.setattr(strava_tools, "get_elevation", lambda: None)
+
+    loops = strava_tools.plan_loops(START, 10_000, k=1)
+
+    assert [loop["distance_m"] for loop in loops] == [10_000]
+    # The other candidates give up instead of spending their route budget
+    assert len(loop_calls) < 2 * 4
+    assert loop_calls.count(3) == 1
+
+
+def test_library_refresh_plans_with_the_service_token(monkeypatch):
+    """Test that the background job never uses the token of a user"""
+    jobs, tokens = [], []
+
+    class FakeStrava:
+        def explore_segments(self, bounds, activity_type):
+            return []
+
+    class FetchingIndex:
+        def segments_for(self, bounds, fetch):
+            return [fetch(bounds)]
+
+    def no_user_token():
+        raise AssertionError("the job must not use the current user's token")
+
+    monkeypatch.setattr(
+        strava_tools.loop_library, "start_refresh", lambda **job: jobs.append(job)
+    )
+    monkeypatch.setattr(strava_tools, "get_current_token", no_user_token)
+    monkeypatch.setattr(
+        strava_tools.client_pool,
+        "get",
+        lambda token: tokens.append(token) or FakeStrava(),
+    )
+    monkeypatch.setattr(strava_tools, "segment_index", FetchingIndex())
+
+    monkeypatch.setattr(strava_tools, "LOOP_LIBRARY_STRAVA_TOKEN", None)
+    assert strava_tools.start_loop_library_refresh() is None
+    assert jobs == []
+
+    monkeypatch.setattr(strava_tools, "LOOP_LIBRARY_STRAVA_TOKEN", "service")
+    strava_tools.start_loop_library_refresh()
+    assert jobs[0]["build"](START, 10_000) is None  # no segment in the area
+    assert tokens == ["service"]
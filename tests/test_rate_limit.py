@@ -0,0 +1,56 @@
+"""
+Simple tests for the Strava rate-limit governor
+"""
+
+import os
+import sys
+
+import pytest
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from chathletique_mcp.rate_limit import (
+    BACKGROUND,
+    RateLimitError,
+    RateLimitGovernor,
+    priority,
+)
+
+
+class FakeClock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_background_calls_keep_out_of_the_reserve():
+    """Test that background calls stop before interactive ones"""
+    governor = RateLimitGovernor(short_limit=10, reserve=0.2, clock=FakeClock())
+
+    with priority(BACKGROUND):
+        for _ in range(8):
+            governor.acquire()
+        with pytest.raises(RateLimitError):
+            governor.acquire()
+
+    governor.acquire()  # interactive calls may use the reserve
+    assert governor.metrics()["throttled_background"] == 1
+
+
+def test_headers_resync_and_fail_fast_with_retry_after():
+    """Test that usage headers are applied and the retry hint points to the reset"""
+    clock = FakeClock(now=100.0)
+    governor = RateLimitGovernor(max_wait=0, clock=clock)
+
+    governor.update({"X-RateLimit-Limit": "100,1000", "X-RateLimit-Usage": "100,500"})
+
+    with pytest.raises(RateLimitError) as exc_info:
+        governor.acquire()
+    assert exc_info.value.retry_after == 800.0
+
+    clock.now = 900.0  # next quarter hour
+    governor.acquire()
+    assert "strava_rate_limit_long_usage 501" in governor.render_metrics()
@@ -0,0 +1,73 @@
+"""
+Simple tests for the memoized route computations
+"""
+
+import os
+import sys
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from chathletique_mcp import routing
+from chathletique_mcp.cache import TTLCache
+
+
+def test_route_key_quantizes_coordinates():
+    """Test that nearly identical waypoints share a memoization key"""
+    a = routing.route_key((48.85661, 2.35221), (48.8566, 2.3522), [(48.9, 2.3)])
+    b = routing.route_key((48.85659, 2.35219), (48.8566, 2.3522), [(48.9, 2.3)])
+
+    assert a == b
+    assert a != routing.route_key((48.8566, 2.3522), (48.8566, 2.3522), mode="DRIVE")
+
+
+def test_compute_route_is_memoized(monkeypatch):
+    """Test that the Routes API is only called once for the same route"""
+    calls = []
+
+    def fake_request_route(origin, destination, waypoints, mode, api_key):
+        calls.append(origin)
+        return {"distance_m": 1234, "duration_iso": "900s", "encoded_polyline": ""}
+
+    monkeypatch.setattr(routing, "_request_route", fake_request_route)
+    monkeypatch.setattr(routing, "route_cache", TTLCache(maxsize=10))
+
+    with routing.count_route_calls() as route_calls:
+        routing.compute_route((48.85661, 2.35221), (48.86, 2.36))
+        route = routing.compute_route((48.85662, 2.35222), (48.86, 2.36))
+
+    assert route["distance_m"] == 1234
+    assert len(calls) == 1
+    assert route_calls.calls == {"google": 1}  # the memoized hit is not counted
+    assert routing.route_cache.stats()["hits"] == 1
+
+
+class FakeORSClient:
+    """Matrix backend returning the source index as distance"""
+
+    def __init__(self):
+        self.requests = []
+
+    def distance_matrix(self, locations, profile, sources, destinations, metrics):
+        self.requests.append(locations)
+        assert destinations == [0]
+        return {"distances": [[float(locations[s][1] * 1000)] for s in sources]}
+
+
+def test_distances_to_chunks_matrix_requests(monkeypatch):
+    """Test that many sources are resolved in a few chunked matrix requests"""
+    client = FakeORSClient()
+    monkeypatch.setattr(routing, "get_ors_client", lambda: client)
+    monkeypatch.setattr(routing, "route_cache", TTLCache(maxsize=100))
+    sources = [(float(i), 2.0) for i in range(10)]
+
+    with routing.count_route_calls() as route_calls:
+        distances = routing.distances_to(sources, (48.0, 2.0), max_locations=4)
+
+    assert distances == [i * 1000.0 for i in range(10)]
+    assert len(client.requests) == 4  # 3 sources + the destination per request
+    assert all(len(locations) <= 4 for locations in client.requests)
+    assert route_calls.calls == {"ors_matrix": 4}  # one per chunk
+
+    routing.distances_to(sources[:3], (48.0, 2.0), max_locations=4)
+    assert len(client.requests) == 4  # memoized
@@ -0,0 +1,116 @@
+"""
+Simple tests for the persistent segment index
+"""
+
+import os
+import sqlite3
+import sys
+
+import pytest
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from chathletique_mcp.rate_limit import RateLimitError
+from chathletique_mcp.segment_index import SegmentIndex, tile_key
+
+SW = [48.84, 2.30, 48.86, 2.33]
+NE = [48.86, 2.33, 48.88, 2.36]
+
+
+def make_segment(seg_id, lat, lon):
+    return {
+        "id": seg_id,
+        "name": f"Segment {seg_id}",
+        "distance_m": 800.0,
+        "points": [(lat, lon), (lat + 0.001, lon), (lat + 0.002, lon)],
+        "start_latlng": (lat, lon),
+        "end_latlng": (lat + 0.002, lon),
+    }
+
+
+def test_segments_for_fetches_only_missing_tiles(tmp_path):
+    """Test that explored quadrants are served from the index"""
+    index = SegmentIndex(tmp_path / "segments.sqlite3")
+    fetched = []
+
+    def fetch(bounds):
+        fetched.append(bounds)
+        if bounds == SW:
+            return [make_segment(1, 48.85, 2.31), make_segment(2, 48.855, 2.32)]
+        return [make_segment(2, 48.855, 2.32), make_segment(3, 48.87, 2.34)]
+
+    first = index.segments_for([SW, NE], fetch)
+    second = index.segments_for([SW, NE], fetch)
+
+    assert len(fetched) == 2
+    assert first == second
+    # Segment 2 was returned in both quadrants but is only kept once
+    assert [[seg["id"] for seg in segs] for segs in second] == [[1, 2], [3]]
+    assert second[0][0]["points"][0] == (48.85, 2.31)
+
+
+def test_fetch_errors_reach_the_caller(tmp_path):
+    """Test that rate limits and total failures are raised, not emptied"""
+    index = SegmentIndex(tmp_path / "segments.sqlite3")
+
+    def rate_limited(bounds):
+        if bounds == NE:
+            raise RateLimitError(42, "short")
+        return [make_segment(1, 48.85, 2.31)]
+
+    with pytest.raises(RateLimitError) as exc_info:
+        index.segments_for([SW, NE], rate_limited)
+    assert exc_info.value.retry_after == 42
+    assert [seg["id"] for seg in index.lookup(SW)] == [1]  # kept for the retry
+
+    def failing(bounds):
+        raise ConnectionError("Strava is down")
+
+    with pytest.raises(ConnectionError):
+        index.segments_for([NE], failing)
+
+    def partly_failing(bounds):
+        if bounds == NE:
+            raise ConnectionError("Strava is down")
+        return [make_segment(1, 48.85, 2.31)]
+
+    # One quadrant failing among fetched ones is only left empty
+    fresh = SegmentIndex(tmp_path / "fresh.sqlite3")
+    found = fresh.segments_for([SW, NE], partly_failing)
+    assert [[seg["id"] for seg in segs] for segs in found] == [[1], []]
+
+
+def test_expired_tiles_are_explored_again(tmp_path):
+    """Test the tile TTL and the tile key"""
+    index = SegmentIndex(tmp_path / "segments.sqlite3", ttl=-1)
+    index.store(SW, [make_segment(1, 48.85, 2.31)])
+
+    assert index.lookup(SW) is None
+    assert tile_key(SW) != tile_key(NE)
+
+
+def test_bounds_inside_an_explored_area_are_served_locally(tmp_path):
+    """Test that lookups use the explored area, not the exact bounds"""
+    index = SegmentIndex(tmp_path / "segments.sqlite3")
+    area = [48.84, 2.30, 48.88, 2.36]
+    index.store(area, [make_segment(1, 48.85, 2.31), make_segment(3, 48.87, 2.34)])
+
+    assert [seg["id"] for seg in index.lookup(SW)] == [1]
+    assert [seg["id"] for seg in index.lookup(NE)] == [3]
+    inner = index.lookup([48.845, 2.305, 48.875, 2.35])
+    assert [seg["id"] for seg in inner] == [1, 3]
+    assert index.lookup([48.83, 2.30, 48.86, 2.33]) is None  # partly unexplored
+
+
+def test_failed_store_is_rolled_back(tmp_path):
+    """Test that a failing store leaves nothing behind and the index usable"""
+    index = SegmentIndex(tmp_path / "segments.sqlite3")
+    broken = make_segment("not an id", 48.85, 2.31)
+
+    with pytest.raises(sqlite3.IntegrityError):
+        index.store(SW, [make_segment(1, 48.85, 2.31), broken])
+
+    assert index.lookup(SW) is None
+    index.store(SW, [make_segment(1, 48.85, 2.31)])
+    assert [seg["id"] for seg in index.lookup(SW)] == [1]
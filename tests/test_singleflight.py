@@ -0,0 +1,111 @@
+"""
+Simple tests for the coalescing of concurrent calls
+"""
+
+import asyncio
+import os
+import sys
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from chathletique_mcp.singleflight import SingleFlight, coalesce
+
+
+def test_concurrent_calls_share_one_execution():
+    """Test that identical concurrent calls run once and share the result"""
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "athlete"
+
+    async def scenario():
+        flight = SingleFlight()
+        results = await asyncio.gather(*(flight.do("token", fetch) for _ in range(5)))
+        other = await flight.do("other", fetch)
+        return results, other, len(flight)
+
+    results, other, inflight = asyncio.run(scenario())
+    assert results == ["athlete"] * 5
+    assert other == "athlete"
+    assert len(calls) == 2
+    assert inflight == 0
+
+
+def test_exception_is_shared_then_forgotten():
+    """Test that a failure reaches every waiter and the next call retries"""
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        if len(calls) == 1:
+            raise ConnectionError("Strava down")
+        return "ok"
+
+    async def scenario():
+        flight = SingleFlight()
+        failures = await asyncio.gather(
+            flight.do("token", fetch), flight.do("token", fetch), return_exceptions=True
+        )
+        return failures, await flight.do("token", fetch)
+
+    failures, retry = asyncio.run(scenario())
+    assert all(isinstance(f, ConnectionError) for f in failures)
+    assert retry == "ok"
+    assert len(calls) == 2
+
+
+def test_coalesce_keys_tool_calls_by_normalized_arguments():
+    """Test that a tool runs once per distinct set of arguments"""
+    calls = []
+
+    @coalesce()
+    async def create_itinerary(starting_place: str, distance_km: int = 10) -> str:
+        calls.append((starting_place, distance_km))
+        await asyncio.sleep(0.01)
+        return f"{starting_place}:{distance_km}"
+
+    async def scenario():
+        return await asyncio.gather(
+            create_itinerary("Opéra, Paris"),
+            create_itinerary("Opéra, Paris", 10),
+            create_itinerary(distance_km=10, starting_place="Opéra, Paris"),
+            create_itinerary("Opéra, Paris", 5),
+        )
+
+    results = asyncio.run(scenario())
+    assert results == ["Opéra, Paris:10"] * 3 + ["Opéra, Paris:5"]
+    assert sorted(calls) == [("Opéra, Paris", 5), ("Opéra, Paris", 10)]
+    assert len(create_itinerary.singleflight) == 0
+
+
+def test_coalesce_keys_by_identity_and_skips_unknown_callers():
+    """Test that callers only share results with themselves"""
+    calls = []
+    caller = {"who": "athlete-1"}
+
+    @coalesce(identity=lambda: caller["who"])
+    async def get_user_stats() -> str:
+        who = caller["who"]
+        calls.append(who)
+        await asyncio.sleep(0.01)
+        return f"stats of {who}"
+
+    async def call_as(who):
+        caller["who"] = who
+        return await get_user_stats()
+
+    async def scenario():
+        shared = await asyncio.gather(get_user_stats(), get_user_stats())
+        other = await call_as("athlete-2")
+        anonymous = await asyncio.gather(call_as(None), call_as(None))
+        return shared, other, anonymous
+
+    shared, other, anonymous = asyncio.run(scenario())
+    assert shared == ["stats of athlete-1"] * 2
+    assert other == "stats of athlete-2"
+    assert anonymous == ["stats of None"] * 2
+    assert calls == ["athlete-1", "athlete-2", None, None]
@@ -0,0 +1,63 @@
+"""
+Simple tests for the shared state store
+"""
+
+import os
+import sys
+
+import pytest
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from chathletique_mcp.state_store import (
+    MemoryStateStore,
+    SQLiteStateStore,
+    StateStore,
+    create_state_store,
+)
+
+TOKEN = {"access_token": "abc", "refresh_token": "def", "expires_at": 1_760_000_000}
+
+
+def test_sqlite_state_is_shared_between_stores(tmp_path):
+    """Test that two workers opening the same file see the same tokens"""
+    path = tmp_path / "state.sqlite3"
+    worker_1, worker_2 = SQLiteStateStore(path), SQLiteStateStore(path)
+
+    worker_1.set("tokens", "current", TOKEN)
+    assert worker_2.get("tokens", "current") == TOKEN
+    worker_2.delete("tokens", "current")
+    assert worker_1.get("tokens", "current", default={}) == {}
+    assert oct(os.stat(path).st_mode & 0o777) == "0o600"
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_expiry_and_items(backend, tmp_path):
+    """Test that both backends behave the same"""
+    store = create_state_store(
+        "memory" if backend == "memory" else f"sqlite:///{tmp_path / 'state.db'}"
+    )
+    store.set("tokens", "1", TOKEN)
+    store.set("tokens", "2", TOKEN, ttl=-1)
+    store.set("sessions", "1", {"id": 1})
+
+    assert store.get("tokens", "2") is None
+    assert store.items("tokens") == [("1", TOKEN)]
+    if isinstance(store, MemoryStateStore):
+        # Values are copies, like with the shared stores
+        store.get("tokens", "1")["access_token"] = "changed"  # noqa: S105
+        assert store.get("tokens", "1") == TOKEN
+    with pytest.raises(ValueError):
+        create_state_store("redis://localhost")
+
+
+def test_incomplete_backend_cannot_be_created():
+    """Test that a backend missing a method fails when it is created"""
+
+    class GetOnlyStore(StateStore):
+        def get(self, namespace, key, default=None):
+            return default
+
+    with pytest.raises(TypeError):
+        GetOnlyStore()
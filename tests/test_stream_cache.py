@@ -0,0 +1,43 @@
+"""
+Simple tests for the memory-mapped stream cache
+"""
+
+import os
+import sys
+
+import numpy as np
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from chathletique_mcp.stream_cache import StreamCache
+
+
+def test_get_or_fetch_only_fetches_once(tmp_path):
+    """Test that a cached entry is served memory-mapped without fetching"""
+    cache = StreamCache(tmp_path)
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return {"time": [0, 1, 2], "heartrate": [120, None, 130]}
+
+    first = cache.get_or_fetch(123, "high", "time", fetch)
+    second = cache.get_or_fetch(123, "high", "time", fetch)
+
+    assert len(calls) == 1
+    assert isinstance(second["time"], np.memmap)
+    assert second["time"].dtype == np.int32
+    assert second["heartrate"].dtype == np.float32
+    assert np.isnan(first["heartrate"][1])
+    assert "velocity_smooth" not in second
+
+
+def test_cache_is_keyed_by_resolution_and_series_type(tmp_path):
+    """Test that other resolutions or series types are separate entries"""
+    cache = StreamCache(tmp_path)
+    cache.put(1, "high", "time", {"time": [0, 1]})
+
+    assert cache.get(1, "high", "time") is not None
+    assert cache.get(1, "low", "time") is None
+    assert cache.get(1, "high", "distance") is None
@@ -0,0 +1,61 @@
+"""
+Simple tests for the per-athlete token registry
+"""
+
+import os
+import sys
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from chathletique_mcp.state_store import MemoryStateStore
+from chathletique_mcp.token_registry import TokenRegistry
+
+NOW = 1_760_000_000
+
+
+def token(access, expires_at, refresh="refresh"):
+    return {"access_token": access, "refresh_token": refresh, "expires_at": expires_at}
+
+
+def fake_refresh(calls):
+    def refresh(token_data):
+        calls.append(token_data["access_token"])
+        return {**token_data, **token(f"{token_data['access_token']}+", NOW + 21600)}
+
+    return refresh
+
+
+def test_tokens_are_per_athlete_and_refreshed_when_expired():
+    """Test that athletes do not share tokens and expired ones are refreshed"""
+    calls = []
+    store = MemoryStateStore()
+    registry = TokenRegistry(store, fake_refresh(calls), clock=lambda: NOW)
+    registry.put(1, token("a1", NOW + 3600))
+    registry.put(2, token("a2", NOW - 10))
+
+    assert registry.get(1) == "a1"
+    assert registry.get("2") == "a2+"
+    assert registry.get(3) is None
+    assert calls == ["a2"]
+
+    # Another worker sharing the store sees the refreshed token
+    other = TokenRegistry(store, fake_refresh(calls), clock=lambda: NOW)
+    assert other.get(2) == "a2+"
+    assert calls == ["a2"]
+
+
+def test_background_refresh_before_expiry():
+    """Test that only the tokens expiring within the margin are refreshed"""
+    calls = []
+    registry = TokenRegistry(
+        MemoryStateStore(), fake_refresh(calls), margin=600, clock=lambda: NOW
+    )
+    registry.put(1, token("a1", NOW + 300))
+    registry.put(2, token("a2", NOW + 3600))
+    registry.put(3, token("a3", NOW + 60, refresh=None))
+
+    assert registry.refresh_due() == 1
+    assert calls == ["a1"]
+    assert registry.get(1) == "a1+"
+    assert registry.get(2) == "a2"
@@ -0,0 +1,80 @@
+"""
+Simple tests for the running window scorer
+"""
+
+import json
+import os
+import sys
+
+import numpy as np
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from chathletique_mcp.weather_analysis import (
+    ComfortModel,
+    best_windows,
+    forecast_columns,
+)
+
+SUNRISE = 1_760_000_400  # 09:00 UTC, 11:00 local (UTC+2)
+SUNSET = SUNRISE + 10 * 3600
+
+
+def slot(hours, temp_c, wind=2.0, pop=0.0, rain=0):
+    return {
+        "temp": temp_c + 273.15,
+        "feels_like": temp_c + 273.15,
+        "humidity": 60,
+        "weather": {"main": "Clear", "description": "clear sky"},
+        "wind": {"speed": wind, "deg": 180, "gust": None},
+        "pop": pop,
+        "rain": rain,
+        "dt": SUNRISE + hours * 3600,
+    }
+
+
+FORECAST = [
+    {"sunrise": SUNRISE, "sunset": SUNSET, "timezone": 7200, "name": "Paris"},
+    slot(-6, 12),  # ideal, but at night
+    slot(0, 20),
+    slot(3, 12, pop=0.9, rain=2.5),
+    slot(6, 13),
+    slot(24 + 3, 11, wind=9.0),
+]
+
+
+def test_forecast_columns_convert_units():
+    """Test the NumPy columns built from the filtered forecast"""
+    columns = forecast_columns(FORECAST)
+
+    assert columns["dt"].dtype == np.int64
+    assert np.allclose(columns["feels_like"], [12, 20, 12, 13, 11])
+    assert np.isnan(columns["gust"]).all()
+    assert np.allclose(forecast_columns(FORECAST, units="metric")["temp"][0], 285.15)
+
+
+def test_best_windows_are_daylight_slots_ranked_by_comfort():
+    """Test the ranking and the summary"""
+    result = best_windows(FORECAST, top=3)
+
+    starts = [window["start"] for window in result["best_windows"]]
+    assert starts == ["2025-10-09 17:00", "2025-10-09 11:00", "2025-10-10 14:00"]
+    assert result["best_windows"][0]["feels_like_c"] == 13.0
+    assert result["summary"]["daylight_slots"] == 4
+    assert result["summary"]["rainy_slots"] == 1
+    assert result["place"] == "Paris"
+
+    # A runner who likes it warm
+    warm = best_windows(FORECAST, ComfortModel(ideal_temp_c=20), top=1)
+    assert warm["best_windows"][0]["start"] == "2025-10-09 11:00"
+
+
+def test_summary_without_values_is_valid_json():
+    """Test that missing wind and temperatures give nulls, not NaN"""
+    blank = {**slot(0, 12), "temp": None, "wind": None}
+    result = best_windows([FORECAST[0], blank], top=1)
+
+    assert result["summary"]["max_wind_ms"] is None
+    assert result["summary"]["temp_c"] == [None, None]
+    json.dumps(result, allow_nan=False)
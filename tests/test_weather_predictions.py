@@ -0,0 +1,82 @@
+"""
+Simple tests for the async weather tools
+"""
+
+import asyncio
+import json
+import os
+import sys
+import threading
+
+import pytest
+import requests
+from fastmcp import Client
+from fastmcp.exceptions import ToolError
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from chathletique_mcp import weather_tools
+from chathletique_mcp.forecast_cache import ForecastCache
+
+PLACES = {"Paris": (48.8566, 2.3522), "Lyon": (45.764, 4.8357), "Atlantis": None}
+
+
+class FakeGeocoder:
+    def __init__(self):
+        self.calls = []
+        self.threads = set()
+
+    def geocode(self, place_name):
+        self.calls.append(place_name)
+        self.threads.add(threading.get_ident())
+        if place_name == "Nowhere":
+            raise requests.ConnectionError("Nominatim is down")
+        return PLACES[place_name]
+
+
+def test_weather_predictions_share_cells_and_report_errors(monkeypatch):
+    """Test one geocoding call, one fetch per cell and errors per place"""
+    geocoder = FakeGeocoder()
+    fetched = []
+
+    async def fake_fetch_forecast(lat, lon):
+        fetched.append((lat, lon))
+        if (lat, lon) == PLACES["Lyon"]:
+            raise requests.HTTPError("502 Bad Gateway")
+        return [{"name": "Paris"}]
+
+    monkeypatch.setattr(weather_tools, "token", "key")
+    monkeypatch.setattr(weather_tools, "geocoder", geocoder)
+    monkeypatch.setattr(weather_tools, "forecast_cache", ForecastCache())
+    monkeypatch.setattr(weather_tools, "_fetch_forecast", fake_fetch_forecast)
+
+    places = ["Paris", "48.857,2.352", "Paris", "Lyon", "Atlantis", "Nowhere"]
+    results = json.loads(asyncio.run(weather_tools.get_weather_predictions.fn(places)))
+
+    # Names are geocoded once each, in one thread; coordinates are not
+    assert geocoder.calls == ["Paris", "Lyon", "Atlantis", "Nowhere"]
+    assert len(geocoder.threads) == 1
+    # Paris and the coordinates next to it share one forecast
+    assert sorted(fetched) == [PLACES["Lyon"], PLACES["Paris"]]
+    assert [result["place"] for result in results] == places
+    assert [result.get("forecast") for result in results[:3]] == [
+        [{"name": "Paris"}]
+    ] * 3
+    assert results[3]["error"] == "502 Bad Gateway"
+    assert results[4]["error"] == "Failed to get coordinates"
+    assert results[5]["error"] == "Nominatim is down"
+
+
+def test_running_windows_count_is_validated():
+    """Test that the tool refuses a number of windows out of range"""
+
+    async def call(top):
+        async with Client(weather_tools.mcp) as client:
+            return await client.call_tool(
+                "get_best_running_windows", {"place_name": "Paris", "top": top}
+            )
+
+    for top in (0, weather_tools.RUNNING_WINDOWS_MAX + 1):
+        with pytest.raises(ToolError):
+            asyncio.run(call(top))